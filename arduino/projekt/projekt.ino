@@ -11,6 +11,20 @@
 #define PERIOD_LUX 0.5
 #define PERIOD_PRES 0.5
 
+// Set to 1 to send readings as binary COBS frames instead of ASCII lines.
+// SERIAL_PROTOCOL in constants.py has to be set to 'binary' as well.
+#define BINARY_FRAMES 0
+
+// Sensor and channel IDs used in binary frames, matching serial_protocol.py
+#define ID_TMP116 1
+#define ID_HDC2010 2
+#define ID_OPT3001 3
+#define ID_DPS310 4
+#define CH_TEMPERATURE 1
+#define CH_HUMIDITY 2
+#define CH_LIGHT 3
+#define CH_PRESSURE 4
+
 ClosedCube::Sensor::TMP116 tmp116;
 HDC2010 ssenseHDC2010(HDC2010_I2C_ADDR);
 ClosedCube_OPT3001 opt3001;
@@ -79,13 +93,11 @@ void loop() {
 
     // TMP116
     TMP_temperature = tmp116.readTemperature();
-    Serial.print("TMP116, temperature, ");
-    Serial.println(TMP_temperature);
+    sendReading("TMP116", ID_TMP116, "temperature", CH_TEMPERATURE, TMP_temperature);
 
     // HDC2010
     HDC_temperature = ssenseHDC2010.readTemp();
-    Serial.print("HDC2010, temperature, ");
-    Serial.println(HDC_temperature);
+    sendReading("HDC2010", ID_HDC2010, "temperature", CH_TEMPERATURE, HDC_temperature);
 
     // DPS310
     DPS_ret = Dps310PressureSensor.measureTempOnce(DPS_temperature, oversampling);
@@ -93,12 +105,10 @@ void loop() {
     if (DPS_ret != 0) {
       //Something went wrong.
       //Look at the library code for more information about return codes
-      Serial.print("FAIL! ret = ");
-      Serial.println(DPS_ret);
+      sendFailure(DPS_ret);
     }
     else {
-      Serial.print("DPS310, temperature, ");
-      Serial.println(DPS_temperature);
+      sendReading("DPS310", ID_DPS310, "temperature", CH_TEMPERATURE, DPS_temperature);
     }
   }
 
@@ -107,8 +117,7 @@ void loop() {
     hum_duration = millis();
 
     HDC_humidity = ssenseHDC2010.readHumidity();
-    Serial.print("HDC2010, humidity, ");
-    Serial.println(HDC_humidity);
+    sendReading("HDC2010", ID_HDC2010, "humidity", CH_HUMIDITY, HDC_humidity);
     }
 
   // Light
@@ -116,8 +125,7 @@ void loop() {
     lux_duration = millis();
 
     OPT_lux = opt3001.readResult().lux;
-    Serial.print("OPT3001, light, ");
-    Serial.println(OPT_lux);
+    sendReading("OPT3001", ID_OPT3001, "light", CH_LIGHT, OPT_lux);
   }
 
   // Pressure
@@ -128,12 +136,10 @@ void loop() {
     if (DPS_ret != 0) {
       //Something went wrong.
       //Look at the library code for more information about return codes
-      Serial.print("FAIL! ret = ");
-      Serial.println(DPS_ret);
+      sendFailure(DPS_ret);
     }
     else {
-      Serial.print("DPS310, pressure, ");
-      Serial.println(DPS_pressure);
+      sendReading("DPS310", ID_DPS310, "pressure", CH_PRESSURE, DPS_pressure);
     }
     }
 }
@@ -147,4 +153,73 @@ void configureSensor() {
   newConfig.ModeOfConversionOperation = B11;
 
   OPT3001_ErrorCode errorConfig = opt3001.writeConfig(newConfig);
-}
\ No newline at end of file
+}
+
+// Send a reading as an ASCII line ("DPS310, pressure, 101325.00") or a binary frame, depending on BINARY_FRAMES.
+// Binary frame: sensor ID, channel ID, float32 value, uint32 millis, CRC-16/CCITT-FALSE of those (little-endian),
+// COBS-encoded and terminated by a zero byte.
+void sendReading(const char *sensorName, uint8_t sensorId, const char *channelName, uint8_t channelId, float value) {
+#if BINARY_FRAMES
+  uint8_t frame[12];
+  uint32_t timestamp = millis();
+  frame[0] = sensorId;
+  frame[1] = channelId;
+  memcpy(frame + 2, &value, 4);
+  memcpy(frame + 6, &timestamp, 4);
+  uint16_t crc = crc16(frame, 10);
+  frame[10] = crc & 0xFF;
+  frame[11] = crc >> 8;
+
+  uint8_t encoded[14];
+  size_t length = cobsEncode(frame, sizeof(frame), encoded);
+  encoded[length++] = 0;
+  Serial.write(encoded, length);
+#else
+  Serial.print(sensorName);
+  Serial.print(", ");
+  Serial.print(channelName);
+  Serial.print(", ");
+  Serial.println(value);
+#endif
+}
+
+// Report a failed DPS310 measurement. Only sent in ASCII mode, binary frames carry readings only.
+void sendFailure(int16_t ret) {
+#if !BINARY_FRAMES
+  Serial.print("FAIL! ret = ");
+  Serial.println(ret);
+#endif
+}
+
+uint16_t crc16(const uint8_t *data, size_t length) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < length; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : (crc << 1);
+    }
+  }
+  return crc;
+}
+
+// Consistent overhead byte stuffing - removes zero bytes from input, so zero can be used as frame delimiter.
+// Output has to have room for length + 1 bytes (length < 254).
+size_t cobsEncode(const uint8_t *input, size_t length, uint8_t *output) {
+  size_t codeIndex = 0, outIndex = 1;
+  uint8_t code = 1;
+
+  for (size_t i = 0; i < length; i++) {
+    if (input[i] == 0) {
+      output[codeIndex] = code;
+      codeIndex = outIndex++;
+      code = 1;
+    }
+    else {
+      output[outIndex++] = input[i];
+      code++;
+    }
+  }
+  output[codeIndex] = code;
+
+  return outIndex;
+}
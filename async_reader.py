@@ -0,0 +1,166 @@
+""" Async reader
+
+This file contains the asyncio reader of serial ports, serving all devices from a single thread.
+Instead of a thread per device blocking in read with a 1 s timeout, the file descriptor of each connected port
+is registered with the event loop (loop.add_reader), and whatever has arrived is read without blocking as soon as
+the port becomes readable. Each chunk is split into lines/frames, and readings are stored and passed to the
+door/window opening detector right away, so readings don't wait for a read timeout.
+Ports without a file descriptor the loop can watch (Windows, simulated sample sources) are polled every
+ASYNC_POLL_SECS by a coroutine instead. Flushing stored readings and retention run as coroutines in the same loop.
+
+The reader is used if SERIAL_READER is 'async'; with 'thread', every device is read by its own thread.
+
+It can also be imported as a module and contains the following
+classes:
+    * AsyncReader - asyncio event loop on a thread, reading serial ports of all devices
+"""
+import asyncio
+import threading
+
+import constants
+import file_handler as fh
+
+
+class AsyncReader:
+    """
+        A class used to read serial ports of devices from an asyncio event loop on a single thread.
+
+        Attributes
+        ----------
+        devices : list
+            Devices (devices.Device) whose ports are read.
+
+        Methods
+        -------
+        start(self)
+            Start the event loop thread. Ports are watched whenever their devices are connected.
+            Raises the exception that stopped the loop from starting (e.g. storage couldn't be opened),
+            or TimeoutError if it didn't start in ASYNC_START_SECS.
+
+        stop(self, timeout=None)
+            Stop watching ports and wait up to timeout seconds for the event loop thread to finish.
+    """
+
+    def __init__(self, devices):
+        self.devices = list(devices)
+
+        self._loop = None
+        self._stopping = None
+        self._ready = threading.Event()
+        self._error = None  # exception raised while starting the loop
+        self._thread = None
+        self._watched = {}  # device name : file descriptor registered with the loop, or polling task
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=asyncio.run, args=(self._main(),), daemon=True)
+        self._thread.start()
+        if not self._ready.wait(constants.ASYNC_START_SECS):
+            raise TimeoutError(f'Serial reader did not start in {constants.ASYNC_START_SECS} s')
+        if self._error is not None:
+            raise self._error
+
+    def stop(self, timeout=None):
+        if self._loop is None:
+            return
+
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join(timeout)
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+
+        # start reports exceptions raised here, instead of waiting for the loop forever
+        try:
+            fh.open_storage()
+
+            for device in self.devices:
+                # port monitors report connection changes from their own threads
+                device.port_monitor.add_callback(
+                    lambda connected, device=device: self._loop.call_soon_threadsafe(self._connection_changed,
+                                                                                     device, connected))
+                if device.port_monitor.is_connected():
+                    self._watch(device)
+        except Exception as exception:
+            self._error = exception
+            return
+        finally:
+            self._ready.set()
+
+        tasks = [asyncio.create_task(self._flush()), asyncio.create_task(self._retain())]
+        await self._stopping.wait()
+
+        for device in self.devices:
+            self._unwatch(device)
+        for task in tasks:
+            task.cancel()
+
+    def _connection_changed(self, device, connected):
+        if connected:
+            self._watch(device)
+        else:
+            self._unwatch(device)
+
+    def _watch(self, device):
+        if device.name in self._watched:
+            return
+
+        try:
+            fd = device.port_monitor.serial.fileno()
+            self._loop.add_reader(fd, self._read, device)
+            self._watched[device.name] = fd
+        except (AttributeError, NotImplementedError, OSError):
+            # no file descriptor to watch, or the loop can't watch it
+            self._watched[device.name] = asyncio.create_task(self._poll(device))
+
+    def _unwatch(self, device):
+        watched = self._watched.pop(device.name, None)
+        if isinstance(watched, asyncio.Task):
+            watched.cancel()
+        elif watched is not None:
+            self._loop.remove_reader(watched)
+
+    def _read(self, device):
+        """ Store everything that arrived on the device's port. Called when the port becomes readable. """
+
+        try:
+            fh.store_to_csv(device, wait=False)
+        except Exception as exception:
+            print(f'Storing readings of device {device.name} failed: {exception!r}')
+
+    async def _poll(self, device):
+        while True:
+            self._read(device)
+            await asyncio.sleep(constants.ASYNC_POLL_SECS)
+
+    async def _flush(self):
+        while True:
+            await asyncio.sleep(constants.FLUSH_INTERVAL_SECS)
+            try:
+                fh.writer.flush_if_due()
+                fh.history.flush_if_due()
+            except Exception as exception:
+                print(f'Flushing stored readings failed: {exception!r}')
+
+    async def _retain(self):
+        """ Every RETENTION_INTERVAL_SECS, trim CSV files of connected devices to BUFFER_MINUTES length,
+            and delete history older than its retention periods.
+            Runs in the loop thread, so no readings are appended to files while they are trimmed.
+            Errors are reported and retention is tried again next time, as by thread_serial.
+        """
+
+        while True:
+            await asyncio.sleep(constants.RETENTION_INTERVAL_SECS)
+
+            try:
+                fh.writer.flush()
+                for device in self.devices:
+                    if device.port_monitor.is_connected():
+                        for filepath in device.streams.values():
+                            fh.impl_circular_buffer(filepath)
+                fh.history.prune()
+            except Exception as exception:
+                print(f'Retention of stored readings failed: {exception!r}')
@@ -0,0 +1,310 @@
+"""Benchmark
+
+This file contains the benchmark suite of the app's hot paths, run on synthetic sensor data:
+    * impl_circular_buffer - trimming a sensor CSV file of n rows, half of them older than BUFFER_MINUTES
+    * check_pressure_diffs - feeding n pressure readings to the door/window opening detector and checking it
+    * store_to_csv - storing n readings read from a fake serial port (encoded in SERIAL_PROTOCOL)
+    * make_plots - making and rendering a sensor figure from buffers of n readings
+    * construct_labels - constructing current value messages (10000 calls, doesn't depend on n)
+    * update_start_data - a full start page update cycle, with buffers of n readings per sensor
+
+Nothing is shown on screen - figures are rendered with the Agg backend, and the start page is made headless.
+CSV files and history are written to a temporary folder, so files set in config.ini are not touched.
+Results are written to a JSON file, by default benchmark.json in the system's temporary folder, so runs don't leave
+files in the repository. Passing results of a previous run (e.g. of another commit) with --compare prints how the
+medians changed, and exits with status 1 if any benchmark got slower than --threshold times.
+
+Usage:
+    python benchmark.py [--rows 1000 100000 10000000] [--repeat 5] [--output benchmark.json]
+                        [--compare baseline.json] [--threshold 1.25]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+import constants
+
+# point sensor files to a temporary folder before modules using them are imported
+folder = tempfile.mkdtemp(prefix='rpm-benchmark-')
+for name in ['tmp116_csv', 'hdc2010_temp_csv', 'hdc2010_hum_csv', 'opt3001_csv', 'dps310_temp_csv',
+             'dps310_pressure_csv']:
+    setattr(constants, name, os.path.join(folder, os.path.basename(getattr(constants, name))))
+constants.csv_folder = folder
+constants.streams = {stream: os.path.join(folder, os.path.basename(filepath))
+                     for stream, filepath in constants.streams.items()}
+constants.HISTORY_DB = os.path.join(folder, 'history.db')
+constants.devices = {constants.DEFAULT_DEVICE: {'serial_port': constants.SERIAL_PORT, 'csv': folder,
+                                                'streams': constants.streams}}
+
+import element_constructor as ec  # noqa: E402
+import file_handler as fh  # noqa: E402
+import pages as pg  # noqa: E402
+import pressure_detector as pdt  # noqa: E402
+import sensor_buffer as sb  # noqa: E402
+import serial_protocol as sp  # noqa: E402
+
+LABEL_CALLS = 10000
+
+
+class FakeSerial:
+    """ Serial port returning prepared bytes, up to chunk bytes waiting at a time like a UART buffer. """
+
+    def __init__(self, data, chunk=4096):
+        self.data = data
+        self.chunk = chunk
+        self.position = 0
+
+    @property
+    def in_waiting(self):
+        return min(len(self.data) - self.position, self.chunk)
+
+    def read(self, size=1):
+        data = self.data[self.position:self.position + size]
+        self.position += len(data)
+        return data
+
+
+class StringVar:
+    """ Stand-in for tk.StringVar on the headless start page. """
+
+    def __init__(self):
+        self.value = ''
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def generate_csv(filepath, rows, span):
+    """ Write a sensor CSV file of rows TMP116 readings, evenly spread over the last span seconds. """
+
+    now = time.time()
+    step = span / rows
+    with open(filepath, 'w') as file:
+        for i in range(rows):
+            file.write(f'{round((now - span + i * step) * 1000)}, TMP116, temperature, {21 + (i % 100) / 100:.2f}\n')
+
+
+def fill_buffers(rows):
+    """ Fill buffers of all sensors with rows readings each, spread over BUFFER_MINUTES up to now. """
+
+    span = constants.BUFFER_MINUTES * 60
+    for (sensor, quantity), filepath in constants.streams.items():
+        buffer = sb.get_buffer(filepath)
+        buffer.clear()
+        base = constants.SYNTHETIC_VALUES[(sensor, quantity)][0]
+        start = time.time() - span
+        for i in range(rows):
+            buffer.append(start + i * span / rows, base + random.random())
+
+
+def touch_buffers():
+    """ Append a reading to every buffer, like the serial thread between two updates. """
+
+    for filepath in constants.streams.values():
+        buffer = sb.get_buffer(filepath)
+        buffer.append(time.time(), buffer.latest())
+
+
+def measure(run, repeat, setup=None):
+    """ Return list of seconds run took in each of repeat runs, calling setup (untimed) before each.
+        A first, untimed run warms up caches (fonts, imports, ...).
+    """
+
+    times = []
+    for i in range(repeat + 1):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        if i > 0:
+            times.append(time.perf_counter() - start)
+
+    return times
+
+
+def bench_circular_buffer(rows, repeat):
+    template = os.path.join(folder, 'template.csv')
+    generate_csv(template, rows, constants.BUFFER_MINUTES * 60 * 2)  # half of rows older than BUFFER_MINUTES
+    filepath = constants.tmp116_csv
+
+    times = measure(lambda: fh.impl_circular_buffer(filepath), repeat,
+                    setup=lambda: shutil.copyfile(template, filepath))
+    os.remove(template)
+    return times
+
+
+def bench_pressure_diffs(rows, repeat):
+    start = time.time() - rows * 0.01
+    readings = [(start + i * 0.01, 101325 + random.random() + (10 if i == rows // 2 else 0)) for i in range(rows)]
+
+    def run():
+        for timestamp, value in readings:
+            fh.default_device.pressure_detector.add(timestamp, value)
+        fh.check_pressure_diffs()
+
+    def setup():
+        fh.default_device.pressure_detector = pdt.PressureDetector()
+
+    return measure(run, repeat, setup)
+
+
+def bench_store_to_csv(rows, repeat):
+    streams = list(constants.streams)
+    data = b''.join(sp.encode_reading(sp.Reading(*streams[i % len(streams)], 20 + (i % 100) / 100, i * 10),
+                                      constants.SERIAL_PROTOCOL)
+                    for i in range(rows))
+
+    def run():
+        while fh.port_monitor.serial.position < len(data):
+            fh.store_to_csv()
+        fh.writer.flush()
+        fh.history.flush()
+
+    def setup():
+        fh.port_monitor.serial = FakeSerial(data)
+        fh.decoder.reset()
+
+    return measure(run, repeat, setup)
+
+
+def bench_make_plots(rows, repeat):
+    filepaths = pg.StartPage.plot_specs[0][0]
+
+    def run():
+        figure = ec.make_plots(filepaths, (5, 3), 'Temperatura', '°C')
+        FigureCanvasAgg(figure).draw()
+
+    return measure(run, repeat, setup=touch_buffers)
+
+
+def bench_construct_labels(rows, repeat):
+    def run():
+        for i in range(LABEL_CALLS):
+            ec.construct_labels(temp=15 + i % 10, humidity=25 + i % 40, light=10 + i % 2000,
+                                pressure=99990 + i % 2000, tips_wanted=True)
+
+    return measure(run, repeat)
+
+
+def bench_update_start_data(rows, repeat):
+    page = SimpleNamespace(indicator_message=StringVar(), period_message=StringVar(), doors_message=StringVar())
+    page.plots = [ec.Plot(None, files, (5, 3), title, unit, color)
+                  for files, title, unit, color, _ in pg.StartPage.plot_specs]
+
+    return measure(lambda: pg.StartPage.update_start_data(page), repeat, setup=touch_buffers)
+
+
+# name : (benchmark, whether it needs sensor buffers of n readings)
+benchmarks = {'impl_circular_buffer': (bench_circular_buffer, False),
+              'check_pressure_diffs': (bench_pressure_diffs, False),
+              'store_to_csv': (bench_store_to_csv, False),
+              'make_plots': (bench_make_plots, True),
+              'construct_labels': (bench_construct_labels, False),
+              'update_start_data': (bench_update_start_data, True)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmarks(rows_list, repeat, names):
+    results = []
+    for rows in rows_list:
+        for name in names:
+            benchmark, needs_buffers = benchmarks[name]
+            if name == 'construct_labels' and rows != rows_list[0]:
+                continue  # doesn't depend on rows
+            if needs_buffers:
+                fill_buffers(rows)  # again before each, store_to_csv adds readings too
+
+            times = benchmark(rows, repeat)
+            result = {'name': name, 'rows': None if name == 'construct_labels' else rows, 'repeat': repeat,
+                      'min': min(times), 'median': statistics.median(times), 'mean': statistics.mean(times)}
+            results.append(result)
+            print(f"{name:22} {str(result['rows']):>10} rows  median {result['median'] * 1000:10.2f} ms"
+                  f"  min {result['min'] * 1000:10.2f} ms")
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """ Print median change of every benchmark against baseline results. Returns True if none got slower
+        than threshold times.
+    """
+
+    previous = {(result['name'], result['rows']): result for result in baseline['results']}
+    passed = True
+
+    print(f"\nCompared to {baseline.get('commit')}:")
+    for result in results:
+        old = previous.get((result['name'], result['rows']))
+        if old is None:
+            continue
+
+        ratio = result['median'] / old['median'] if old['median'] else float('inf')
+        regression = ratio > threshold
+        passed = passed and not regression
+        print(f"{result['name']:22} {str(result['rows']):>10} rows  {ratio:6.2f}x"
+              f"{'  REGRESSION' if regression else ''}")
+
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the hot paths of the app on synthetic sensor data.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='numbers of rows/readings to run benchmarks with (1k to 10M)')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timed runs per benchmark')
+    parser.add_argument('--only', nargs='+', choices=list(benchmarks), default=list(benchmarks),
+                        help='benchmarks to run')
+    parser.add_argument('--output', default=os.path.join(tempfile.gettempdir(), 'benchmark.json'),
+                        help='JSON file results are written to')
+    parser.add_argument('--compare', help='JSON file with results of a previous run to compare to')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='median slowdown against --compare results counted as a regression')
+    parser.add_argument('--seed', type=int, default=0, help='seed of generated readings')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    try:
+        results = run_benchmarks(args.rows, args.repeat, args.only)
+    finally:
+        fh.close_writer()
+        shutil.rmtree(folder, ignore_errors=True)
+
+    report = {'commit': git_commit(), 'date': datetime.now().isoformat(timespec='seconds'),
+              'python': platform.python_version(), 'platform': platform.platform(),
+              'protocol': constants.SERIAL_PROTOCOL, 'results': results}
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f'\nResults written to {args.output}')
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if not compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Collector
+
+This file runs the serial communication without the GUI, as a standalone long-running process.
+It stores readings from the Arduino to CSV files and history, trims CSV files to BUFFER_MINUTES,
+and detects door/window openings, the same way the app does - but keeps doing so when the app window is closed,
+and isn't slowed down by the Tk loop.
+
+While it runs, it updates COLLECTOR_FILE every COLLECTOR_HEARTBEAT_SECS seconds. An app started while the file
+is being updated attaches to the collector - it doesn't read serial itself, and only shows readings the collector
+stores. Readings are passed to attached apps through shared memory ring buffers (shared_ring.py), and CSV files
+are kept as persistent storage.
+
+Usage:
+    python collector.py
+Stop with Ctrl+C (or SIGTERM), pending readings are flushed to files before exiting.
+"""
+import os
+import signal
+import sys
+import threading
+from datetime import datetime
+
+import constants
+import file_handler as fh
+import instrumentation as im
+
+stopped = threading.Event()  # set when the collector should exit
+
+
+def heartbeat():
+    """ Write collector's process ID to COLLECTOR_FILE, updating its modification time. """
+
+    with open(constants.COLLECTOR_FILE, 'w') as file:
+        file.write(f'{os.getpid()}\n')
+
+
+def stop(signum=None, frame=None):
+    stopped.set()
+
+
+def report_opening(name, timestamp):
+    print(f'{constants.door_open_msg}{datetime.fromtimestamp(timestamp).strftime("%H:%M:%S")} ({name})')
+
+
+def main():
+    if fh.collector_running():
+        print(f'Collector already running ({constants.COLLECTOR_FILE} was recently updated).')
+        sys.exit(1)
+
+    fh.folder_prep()  # prepare csv folder
+    fh.publish_rings()  # publish readings to attached apps through shared memory
+    for name, device in fh.devices.items():
+        device.pressure_detector.add_callback(lambda timestamp, name=name: report_opening(name, timestamp))
+    fh.connect_to_serial()  # start serial communication, reconnecting whenever the device is plugged in
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        while not stopped.is_set():
+            heartbeat()
+            stopped.wait(constants.COLLECTOR_HEARTBEAT_SECS)
+    finally:
+        fh.close_writer()  # flush pending sensor readings to csv
+        fh.close_rings()
+        if im.enabled:
+            im.dump()
+        os.remove(constants.COLLECTOR_FILE)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,11 +5,13 @@ Constants are grouped by type and use.
 """
 
 import configparser
-import serial
+import os
 
 # File locations from config
+# values in [updatable] can change while the app runs, they are kept by settings.py
+CONFIG_FILE = 'config.ini'
 configp = configparser.ConfigParser()
-configp.read('config.ini')
+configp.read(CONFIG_FILE)
 config = configp['default']
 uconfig = configp['updatable']
 
@@ -20,25 +22,88 @@ hdc2010_hum_csv = config['hdc2010_hum_csv']
 opt3001_csv = config['opt3001_csv']
 dps310_temp_csv = config['dps310_temp_csv']
 dps310_pressure_csv = config['dps310_pressure_csv']
+history_db = config.get('history_db', os.path.join(csv_folder, 'history.db'))
+sample_source = config.get('sample_source', 'serial')
+replay_folder = config.get('replay_folder', os.path.join(csv_folder, 'replay'))
+
+# Sensor streams - (sensor name, measured value) as sent over serial, matched to CSV files
+streams = {('TMP116', 'temperature'): tmp116_csv,
+           ('HDC2010', 'temperature'): hdc2010_temp_csv,
+           ('HDC2010', 'humidity'): hdc2010_hum_csv,
+           ('OPT3001', 'light'): opt3001_csv,
+           ('DPS310', 'temperature'): dps310_temp_csv,
+           ('DPS310', 'pressure'): dps310_pressure_csv}
 
 # Serial communication info
-SERIAL_PORT = uconfig['serial_port']
-try:
-    serial = serial.Serial(SERIAL_PORT, 19200, timeout=1)
-except serial.serialutil.SerialException:
-    pass
+SERIAL_PORT = uconfig['serial_port']  # at startup, settings.current.serial_port is kept up to date
+BAUD_RATE = 19200
+SERIAL_PROTOCOL = 'ascii'  # 'ascii' or 'binary', must match BINARY_FRAMES in projekt.ino
+PORT_POLL_SECS = 1
+RECONNECT_MIN_SECS = 1
+RECONNECT_MAX_SECS = 60
+SERIAL_READER = 'async'  # 'async' - all devices read by one asyncio loop, or 'thread' - a thread per device
+ASYNC_POLL_SECS = 0.01  # for ports the asyncio loop can't watch
+ASYNC_START_SECS = 10  # longest wait for the asyncio reader to open storage and watch ports
+
+# Devices - the default one configured above, and one per [device:<name>] section of config.ini,
+# with its own serial port and CSV folder (default <csv>/<name>) for files of its sensor streams
+DEFAULT_DEVICE = 'default'
+devices = {DEFAULT_DEVICE: {'serial_port': SERIAL_PORT, 'csv': csv_folder, 'streams': streams}}
+for section in configp.sections():
+    if section.startswith('device:'):
+        device_folder = configp[section].get('csv', os.path.join(csv_folder, section[len('device:'):]))
+        devices[section[len('device:'):]] = {'serial_port': configp[section]['serial_port'], 'csv': device_folder,
+                                             'streams': {stream: os.path.join(device_folder, os.path.basename(filepath))
+                                                         for stream, filepath in streams.items()}}
+
+# Sample sources - simulated devices used instead of the Arduino (see sample_source.py)
+SAMPLE_SOURCE = sample_source  # 'serial', 'synthetic' or 'replay'
+SYNTHETIC_RATES_HZ = {stream: 1 for stream in streams}
+SYNTHETIC_PROFILE = 'noise'  # 'noise' or 'step'
+SYNTHETIC_STEP_SECS = 30
+SYNTHETIC_VALUES = {('TMP116', 'temperature'): (21.5, 0.05, 2),  # base value, noise deviation, step
+                    ('HDC2010', 'temperature'): (21.8, 0.1, 2),
+                    ('HDC2010', 'humidity'): (45, 0.5, 10),
+                    ('OPT3001', 'light'): (300, 5, 400),
+                    ('DPS310', 'temperature'): (22.1, 0.05, 2),
+                    ('DPS310', 'pressure'): (101325, 0.5, 10)}
+REPLAY_FOLDER = replay_folder
+REPLAY_SPEED = 1
+REPLAY_LOOP = True
 
 # Basic application info
-headers = ['Vrijeme', 'Senzor', 'Velicina', 'Vrijednost']
+headers = ['Vrijeme', 'Senzor', 'Velicina', 'Vrijednost']  # 'Vrijeme' in epoch milliseconds
+LEGACY_TIME_FORMAT = '%d/%m/%Y %H:%M:%S'  # of 'Vrijeme' in CSV files written by older versions
 START_UPDATE_INTERVAL_SECS = 2
 SENSOR_UPDATE_INTERVAL_SECS = 10
+UPDATE_WORKERS = 2
+UPDATE_POLL_MS = 50
+DOWNSAMPLE_METHOD = 'minmax'  # 'minmax' or 'lttb'
 BUFFER_MINUTES = 10
+RETENTION_INTERVAL_SECS = 60
+FLUSH_MAX_LINES = 20
+FLUSH_INTERVAL_SECS = 1
+SNAPSHOT_CACHE_SIZE = 12
+HISTORY_DB = history_db
+HISTORY_RAW_DAYS = 7
+HISTORY_MINUTE_DAYS = 90
+HISTORY_RAW_SPAN_SECS = 60 * 60
+HISTORY_MAX_POINTS = 2000
+INSTRUMENTATION = False  # can also be switched on from the diagnostics page
+METRICS_SAMPLES = 1000
+METRICS_FILE = os.path.join(csv_folder, 'metrics.json')
+STARTUP_TARGET_SECS = 0.5  # from launch to first paint of the app window
 NUM_OF_SENSORS = 6
+STARTUP_WAIT_SECS = 15
+COLLECTOR_FILE = os.path.join(csv_folder, 'collector.pid')
+COLLECTOR_HEARTBEAT_SECS = 5
+SHARED_RING_RECORDS = 2 ** 16  # per sensor stream, 1 MB each
+SHARED_RING_PREFIX = 'rpm'
 APP_NAME = 'Centrala za upravljanje pametnim stanom'
 START_NAME = 'POČETNA STRANICA'
-ICON_PATH = uconfig['icon_path']
+DIAGNOSTICS_NAME = 'DIJAGNOSTIKA'
 PRESSURE_INTERVAL_SECS = 2
-PRESSURE_DIFF_PA = 4
+PRESSURE_DIFF_PA = 4  # unless set by pressure_diff_pa in config.ini
 
 # Fonts
 LARGE_FONT = ("Verdana", 18)
@@ -112,13 +177,3 @@ messages_high = {key: messages[key]
 
 # Visual
 colors = ['r', 'g', 'b', 'deepskyblue', 'orange', 'darkorchid']
-
-# Indicators
-TEMP_MIN = float(uconfig['temp_min'])
-TEMP_MAX = float(uconfig['temp_max'])
-HUM_MIN = float(uconfig['hum_min'])
-HUM_MAX = float(uconfig['hum_max'])
-LUX_MIN = float(uconfig['lux_min'])
-LUX_MAX = float(uconfig['lux_max'])
-PRES_MIN = float(uconfig['pres_min'])
-PRES_MAX = float(uconfig['pres_max'])
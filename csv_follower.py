@@ -0,0 +1,164 @@
+""" CSV follower
+
+This file contains the follower used to read sensor CSV files incrementally.
+Sensor CSV files only grow between retention passes, so after the first read, only lines appended since
+the previous read are parsed. A retention pass always drops the oldest line, so a changed first line is detected
+(as are a shrinking file or a changed inode - file replaced), and the file is then read from the start again.
+This also works for files trimmed by another process (a collector), and for files that grew back past the
+previous offset after being trimmed. Retention in this process also invalidates followers of the files it trims.
+
+It can also be imported as a module and contains the following
+classes and methods:
+    * CsvFollower - follows a sensor CSV file from the byte offset it was last read to
+    * parse_time - parses a CSV timestamp (epoch milliseconds or legacy format) to epoch seconds
+    * parse_record - parses a single CSV line into an (epoch, value) reading
+    * read_first_line - returns the first complete line of a file
+    * read_first_record - returns the first reading in a CSV file without reading the rest of it
+"""
+import os
+from datetime import datetime
+
+import constants
+import snapshot_cache as sc
+
+
+class CsvFollower:
+    """
+        A class used to follow readings appended to a sensor CSV file.
+
+        Attributes
+        ----------
+        filepath : str
+            Location of the followed file.
+
+        offset : int
+            Byte offset in the file the next read starts from. None before the first read.
+
+        Methods
+        -------
+        read_new(self)
+            Return (readings, reset) - list of (epoch, value) readings appended since the previous read,
+            and whether the file was read from the start (first read, retention pass or replacement),
+            in which case readings from previous reads should be discarded.
+
+        skip_to_end(self)
+            Move to the end of the file, so readings already in it aren't returned by the next read.
+
+        invalidate(self)
+            Make the next read start from the beginning of the file, e.g. after it was trimmed.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.offset = None
+
+        self._inode = None
+        self._first = None  # first line of the file at the previous read
+
+    def read_new(self):
+        try:
+            stat = os.stat(self.filepath)
+        except FileNotFoundError:
+            return [], False
+
+        # read whole file on first read, or if it was trimmed or replaced
+        first = read_first_line(self.filepath)
+        if (self.offset is None or stat.st_ino != self._inode or stat.st_size < self.offset
+                or first != self._first):
+            self._inode = stat.st_ino
+            self._first = first
+            data = sc.get_snapshot(self.filepath)
+            if data is None:
+                self.offset = 0
+                return [], True
+
+            self.offset = data.attrs['offset']
+            return list(zip(data['Vrijeme'], data['Vrijednost'].astype(float))), True
+
+        if stat.st_size == self.offset:
+            return [], False
+
+        with open(self.filepath, 'rb') as file:
+            file.seek(self.offset)
+            chunk = file.read(stat.st_size - self.offset)
+
+        # leave incomplete last line for the next read
+        chunk = chunk[:chunk.rfind(b'\n') + 1]
+        self.offset += len(chunk)
+
+        return [parse_record(line) for line in chunk.splitlines() if line.strip()], False
+
+    def skip_to_end(self):
+        try:
+            stat = os.stat(self.filepath)
+        except FileNotFoundError:
+            return
+
+        # an incomplete last line is left for the next read
+        with open(self.filepath, 'rb') as file:
+            file.seek(max(stat.st_size - 4096, 0))
+            tail = file.read(stat.st_size - file.tell())
+        self.offset = stat.st_size - len(tail) + tail.rfind(b'\n') + 1
+        self._inode = stat.st_ino
+        self._first = read_first_line(self.filepath)
+
+    def invalidate(self):
+        self.offset = None
+
+
+def parse_time(field):
+    """ Return epoch seconds of a CSV timestamp.
+
+        Arguments:
+            field - epoch milliseconds, e.g. '1792310400000', or LEGACY_TIME_FORMAT of files written by older
+                    versions, e.g. '18/10/2026 10:00:00'
+    """
+
+    field = field.strip()
+    if field.isdigit():
+        return int(field) / 1000
+
+    return datetime.strptime(field, constants.LEGACY_TIME_FORMAT).timestamp()
+
+
+def parse_record(line):
+    """ Return (epoch, value) reading from a sensor CSV line.
+
+        Arguments:
+            line - bytes of a single CSV line, e.g. b'1792310400000, TMP116, temperature, 22.50'
+    """
+
+    fields = line.decode().split(',')
+
+    return parse_time(fields[0]), float(fields[3])
+
+
+def read_first_line(filepath):
+    """ Return bytes of the first complete line of a file, None if it has none (or doesn't exist).
+
+        Arguments:
+            filepath - location of the file
+    """
+
+    try:
+        with open(filepath, 'rb') as file:
+            line = file.readline()
+    except FileNotFoundError:
+        return None
+
+    return line if line.endswith(b'\n') else None
+
+
+def read_first_record(filepath):
+    """ Return first (epoch, value) reading in CSV file, None if it has none.
+        Only the first line is read, however long the file is.
+
+        Arguments:
+            filepath - location of the sensor's CSV file
+    """
+
+    line = read_first_line(filepath)
+    if line is None:
+        return None
+
+    return parse_record(line)
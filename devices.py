@@ -0,0 +1,77 @@
+""" Devices
+
+This file contains the state kept for each Arduino device readings are collected from.
+Besides the default device (SERIAL_PORT), more devices, e.g. one per room, can be configured in config.ini
+(see devices in constants.py). Each device has its own serial port monitor, decoder, door/window opening detector
+and CSV files, so a failing device doesn't affect the others. Devices are read as set by SERIAL_READER - all by
+one asyncio loop (see async_reader.py), or each by its own thread.
+
+It can also be imported as a module and contains the following
+classes and methods:
+    * Device - serial port, decoder, detector and sensor streams of a single device
+    * make_devices - returns all configured devices
+"""
+import constants
+import pressure_detector as pdt
+import serial_monitor as sm
+import serial_protocol as sp
+
+
+class Device:
+    """
+        A class used to keep the state of a device readings are collected from.
+
+        Attributes
+        ----------
+        name : str
+            Name of the device, DEFAULT_DEVICE or the <name> of its [device:<name>] section.
+
+        streams : dict
+            (sensor, quantity) : CSV file the device's readings of that stream are stored to.
+
+        port_monitor : serial_monitor.PortMonitor
+            Keeps the device's serial port open while the device is connected.
+
+        decoder : serial_protocol.FrameDecoder
+            Decodes bytes read from the device into readings.
+
+        pressure_detector : pressure_detector.PressureDetector
+            Detects door/window openings from the device's pressure readings.
+
+        pressure_csv : str
+            CSV file of the device's pressure readings.
+
+        thread : threading.Thread
+            Thread storing the device's readings if SERIAL_READER is 'thread', None until started.
+
+        Methods
+        -------
+        history_stream(self, stream)
+            Return name of stream in history. Streams of other than the default device are prefixed by device name.
+    """
+
+    def __init__(self, name, serial_port, streams, serial=None):
+        self.name = name
+        self.streams = streams
+        self.port_monitor = sm.PortMonitor(serial_port, serial=serial)
+        self.decoder = sp.FrameDecoder(constants.SERIAL_PROTOCOL)
+        self.pressure_detector = pdt.PressureDetector()
+        self.thread = None
+
+        self.pressure_csv = streams[('DPS310', 'pressure')]
+
+    def history_stream(self, stream):
+        if self.name == constants.DEFAULT_DEVICE:
+            return '/'.join(stream)
+        return '/'.join((self.name,) + tuple(stream))
+
+
+def make_devices():
+    """ Return {device name : Device} of all configured devices. """
+
+    devices = {}
+    for name, device in constants.devices.items():
+        # ports are opened by port monitors, once they are started
+        devices[name] = Device(name, device['serial_port'], device['streams'])
+
+    return devices
@@ -0,0 +1,119 @@
+""" Downsample
+
+This file contains methods used to reduce sensor readings to about as many points as a graph is wide in pixels,
+before they are plotted. Plotting more points than there are pixels costs time without showing anything more.
+
+Readings are reduced by keeping minimum and maximum of each bucket (so short spikes stay visible),
+or using the largest-triangle-three-buckets algorithm. Results are cached per (stream, window, width)
+until the stream's buffer changes.
+
+It can also be imported as a module and contains the following
+methods:
+    * minmax - keeps min and max reading of each of width/2 buckets
+    * lttb - keeps the reading forming the largest triangle with its neighbouring buckets, per bucket
+    * downsample - returns readings of a sensor buffer reduced to about width points, cached
+"""
+import threading
+
+import numpy as np
+
+import constants
+
+_cache = {}  # (stream, window, width) : (buffer version, times, values)
+_lock = threading.Lock()
+
+
+def minmax(times, values, width):
+    """ Return (times, values) with min and max reading of each of width/2 equally sized buckets, in time order.
+
+        Arguments:
+            times, values - NumPy arrays of readings
+            width - number of points to reduce readings to
+    """
+
+    if len(values) <= width:
+        return times, values
+
+    # split readings into equally sized buckets, as rows of a 2D array padded at the end
+    size = -(-len(values) // max(width // 2, 1))
+    buckets = -(-len(values) // size)
+    offsets = np.arange(buckets) * size
+
+    padded = np.full(buckets * size, np.inf)
+    padded[:len(values)] = values
+    min_idx = np.argmin(padded.reshape(buckets, size), axis=1) + offsets
+
+    padded[len(values):] = -np.inf
+    max_idx = np.argmax(padded.reshape(buckets, size), axis=1) + offsets
+
+    indices = np.unique(np.concatenate([min_idx, max_idx]))  # sorted, so readings stay in time order
+    return times[indices], values[indices]
+
+
+def lttb(times, values, width):
+    """ Return (times, values) reduced to width readings using largest-triangle-three-buckets.
+        First and last readings are always kept. In each bucket in between, the reading forming the largest
+        triangle with the reading kept from the previous bucket and the average of the next bucket is kept.
+
+        Arguments:
+            times, values - NumPy arrays of readings
+            width - number of points to reduce readings to
+    """
+
+    if len(values) <= width or width < 3:
+        return times, values
+
+    edges = np.linspace(1, len(values) - 1, width - 1).astype(int)
+
+    # average point of every bucket, computed at once
+    sums_t = np.add.reduceat(times[:-1], edges[:-1])
+    sums_v = np.add.reduceat(values[:-1], edges[:-1])
+    counts = np.diff(edges)
+    avg_t = np.append(sums_t / counts, times[-1])
+    avg_v = np.append(sums_v / counts, values[-1])
+
+    indices = np.empty(width, dtype=int)
+    indices[0], indices[-1] = 0, len(values) - 1
+    a = 0
+    for i in range(width - 2):
+        start, end = edges[i], edges[i + 1]
+        bucket_t, bucket_v = times[start:end], values[start:end]
+
+        # doubled triangle areas of all readings in bucket
+        areas = np.abs((times[a] - avg_t[i + 1]) * (bucket_v - values[a])
+                       - (times[a] - bucket_t) * (avg_v[i + 1] - values[a]))
+        a = start + int(np.argmax(areas))
+        indices[i + 1] = a
+
+    return times[indices], values[indices]
+
+
+def downsample(stream, buffer, width, method=None):
+    """ Return (times, values) of readings in buffer, reduced to about width points.
+        Results are cached per (stream, buffer window, width) and recomputed only after the buffer changes.
+
+        Arguments:
+            stream - name the buffer is cached under (e.g. its CSV file)
+            buffer - SensorBuffer the readings are taken from
+            width - number of points to reduce readings to, usually graph width in pixels
+            method - minmax or lttb; default DOWNSAMPLE_METHOD
+    """
+
+    if method is None:
+        method = lttb if constants.DOWNSAMPLE_METHOD == 'lttb' else minmax
+
+    key = (stream, buffer.minutes, width)
+    version = buffer.version
+
+    with _lock:
+        cached = _cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1], cached[2]
+
+    times, values = buffer.snapshot()
+    times, values = method(np.asarray(times, dtype=float), np.asarray(values, dtype=float), width)
+
+    with _lock:
+        _cache[key] = (version, times, values)
+
+    return times, values
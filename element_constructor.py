@@ -4,27 +4,26 @@ This file contains methods used for construction of visual tkinter elements.
 The return values of its methods are elements to be placed on pages the methods were called from.
 
 This file can also be imported as a module and contains the following
-functions:
-    * make_plots - returns a figure based on data from passed csv file
+functions and classes:
+    * make_plots - returns a figure based on sensor buffers matching passed csv files
+    * plot_data - returns sensor buffer readings as line data
+    * Plot - figure and canvas made once per page and updated with new sensor buffer readings
     * construct_labels - constructs labels based on current value; can include tips as well
-"""
-import importlib
-import os
-
-import pandas as pd
-from matplotlib import pyplot as plt
 
-import file_handler as fh
+matplotlib is only imported when the first figure is made, so the app window can be shown before it is loaded.
+"""
 import constants
+import downsample as ds
+import instrumentation as im
+import sensor_buffer as sb
+import settings as st
 
 
-def reload_constants():
-    """ Reload constants.py module to make all values used updated. """
-    importlib.reload(constants)
-
-
+@im.timed('make_plots')
 def make_plots(filepaths, figsize=None, title=None, unit=None, def_color_idx=-1):
-    """ Return sensor readings plot as a plt.Figure.
+    """ Return sensor readings plot as a matplotlib Figure, with a line for each passed csv file.
+        Readings are taken from in-memory sensor buffers matching the files.
+        Time is plotted in seconds relative to the latest reading, so axis limits only change with values.
 
         Arguments:
             filepaths - locations of files whose readings are to be plotted on the figure
@@ -32,50 +31,167 @@ def make_plots(filepaths, figsize=None, title=None, unit=None, def_color_idx=-1)
             def_color_idx - line colour index in constants.colors
     """
 
+    from matplotlib.figure import Figure
+
     if figsize is None:  # define default figsize
         figsize = (5, 4)
 
-    for filepath in filepaths:
-        if ((os.path.exists(filepath) and os.stat(filepath).st_size == 0)
-                or not os.path.exists(filepath)):
-            filepaths.remove(filepath)
-        else:
-            # implement circular buffer if serial communication is working
-            # if not, just show old data
-            if fh.check_serial_connection():
-                fh.impl_circular_buffer(filepath)
-
-    df_list = [pd.read_csv(filepath, names=constants.headers) for filepath in filepaths]
-    figure = plt.Figure(figsize=figsize, dpi=100)
+    figure = Figure(figsize=figsize, dpi=100)
     ax = figure.add_subplot(111)
 
-    for i in range(len(df_list)):
+    for i, filepath in enumerate(filepaths):
         # when plotting multiple lines on graph, make them r-g-b-...
         if def_color_idx == -1:
             color_idx = i
         else:
             color_idx = def_color_idx
 
-        # place plot of current line to graph
-        if not df_list[i].empty:
-            df_list[i].plot(ax=ax, kind='line', color=constants.colors[color_idx], fontsize=10)
+        # place line for current file to graph
+        ax.plot([], [], color=constants.colors[color_idx], label=sb.get_buffer(filepath).sensor)
 
-    try:
-        ax.legend([df.Senzor[0] for df in df_list])
-    except IndexError:
-        pass
+    set_plot_data(ax, plot_data(filepaths, int(figsize[0] * figure.dpi)))
+    ax.legend()
 
     ax.set_title(title)
+    ax.set_xlim(-constants.BUFFER_MINUTES * 60, 0)
     ax.set_xticks([])
     ax.tick_params(axis='both', labelsize=8)
     ax.set_ylabel(unit, rotation=0)
     ax.set_xlabel('vrijeme', rotation=0)
     ax.ticklabel_format(useOffset=False)
     ax.yaxis.set_label_coords(-0.05, 1.02)
+    limits = plot_limits(ax)
+    if limits is not None:
+        ax.set_ylim(*limits[1])
 
     return figure
 
 
+def plot_data(filepaths, width=None):
+    """ Return (times, values) of readings in sensor buffers matching filepaths, to be set as line data.
+        Doesn't touch any figure, so it can be called from worker threads.
+
+        Arguments:
+            filepaths - locations of files whose readings are to be plotted
+            width - graph width in pixels; if passed, readings are downsampled to about that many points
+    """
+
+    snapshots = []
+    for filepath in filepaths:
+        filepath = sb.shown(filepath)  # of the selected device
+        buffer = sb.get_buffer(filepath)
+        if width is None:
+            snapshots.append(buffer.snapshot())
+        else:
+            snapshots.append(ds.downsample(filepath, buffer, width))
+
+    latest = max([times[-1] for times, _ in snapshots if len(times)], default=0)
+
+    return [([timestamp - latest for timestamp in times], values) for times, values in snapshots]
+
+
+def set_plot_data(ax, data):
+    """ Set data of ax lines to data returned by plot_data. """
+
+    for line, (times, values) in zip(ax.lines, data):
+        line.set_data(times, values)
+
+
+def plot_limits(ax):
+    """ Return (min, max) of data of ax lines and padded y-axis limits fitting them, None if lines have no data. """
+
+    values = [value for line in ax.lines for value in line.get_ydata()]
+    if not values:
+        return None
+
+    low, high = min(values), max(values)
+    pad = (high - low) * 0.25 or max(abs(high) * 0.001, 0.5)
+
+    return (low, high), (low - pad, high + pad)
+
+
+class Plot:
+    """
+        A class used to keep a sensor readings figure and its canvas for the lifetime of a page.
+        The figure and its lines are made once. Updating sets new line data and, while y-axis limits still
+        fit the data, only redraws the lines over a cached background (blitting) instead of the whole figure.
+
+        Attributes
+        ----------
+        figure : matplotlib.figure.Figure
+            Figure made by make_plots.
+
+        canvas : FigureCanvasTkAgg
+            Canvas the figure is drawn on. FigureCanvasAgg if made without master (headless, e.g. in benchmarks).
+
+        widget : tk.Canvas
+            Tk widget of the canvas, to be placed on the page. None if made without master.
+
+        Methods
+        -------
+        prepare(self)
+            Return current sensor buffer readings, downsampled to figure width, as line data.
+            Can be called from worker threads.
+
+        update(self, data=None)
+            Set line data to data returned by prepare (or current readings if not passed) and redraw.
+    """
+
+    def __init__(self, master, filepaths, figsize=None, title=None, unit=None, def_color_idx=-1):
+        self.filepaths = filepaths
+        self.figure = make_plots(filepaths, figsize, title, unit, def_color_idx)
+        self.ax = self.figure.axes[0]
+        self.width = int(self.figure.get_figwidth() * self.figure.dpi)  # readings are downsampled to this
+
+        # lines are animated, so they are left out of full draws and the background cached after them
+        for line in self.ax.lines:
+            line.set_animated(True)
+
+        if master is None:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            self.canvas = FigureCanvasAgg(self.figure)
+            self.widget = None
+        else:
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            self.canvas = FigureCanvasTkAgg(self.figure, master)
+            self.widget = self.canvas.get_tk_widget()
+        self._background = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.canvas.draw()
+
+    def prepare(self):
+        return plot_data(self.filepaths, self.width)
+
+    @im.timed('plot_update')
+    def update(self, data=None):
+        if data is None:
+            data = self.prepare()
+        set_plot_data(self.ax, data)
+
+        limits = plot_limits(self.ax)
+        low, high = self.ax.get_ylim()
+
+        # redraw whole figure if data doesn't fit limits anymore or takes up too little of them
+        if limits is not None and (limits[0][0] < low or limits[0][1] > high
+                                   or limits[1][1] - limits[1][0] < (high - low) * 0.5):
+            self.ax.set_ylim(*limits[1])
+            self.canvas.draw()
+        elif self._background is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._background)
+            self._draw_lines()
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for line in self.ax.lines:
+            self.ax.draw_artist(line)
+        self.canvas.blit(self.ax.bbox)
+
+
 def construct_labels(measure=None, value=None, temp=None, humidity=None, light=None, pressure=None, tips_wanted=False):
     """ Construct labels with messages about current values and tips (if wanted).
 
@@ -87,6 +203,8 @@ def construct_labels(measure=None, value=None, temp=None, humidity=None, light=N
             tips_wanted - indicate whether to include tips in the message; default - no (False)
     """
 
+    settings = st.current  # thresholds as currently set on update page
+
     if measure == constants.temp_string: temp = value
     if measure == constants.hum_string: humidity = value
     if measure == constants.light_string: light = value
@@ -95,13 +213,13 @@ def construct_labels(measure=None, value=None, temp=None, humidity=None, light=N
     label = ''
     if temp is not None:
         label += f'{temp} °C - '
-    if temp is not None and temp < constants.TEMP_MIN:
+    if temp is not None and temp < settings.temp_min:
         label += constants.messages['low_temp']
         if tips_wanted:
             label += '\n' + constants.messages['low_temp_tip']
-    elif temp is not None and constants.TEMP_MIN < temp < constants.TEMP_MAX:
+    elif temp is not None and settings.temp_min < temp < settings.temp_max:
         label += constants.messages['normal_temp']
-    elif temp is not None and temp > constants.TEMP_MAX:
+    elif temp is not None and temp > settings.temp_max:
         label += constants.messages['high_temp']
         if tips_wanted:
             label += '\n' + constants.messages['high_temp_tip']
@@ -110,13 +228,13 @@ def construct_labels(measure=None, value=None, temp=None, humidity=None, light=N
 
     if humidity is not None:
         label += f'{humidity}% - '
-    if humidity is not None and humidity < constants.HUM_MIN:
+    if humidity is not None and humidity < settings.hum_min:
         label += constants.messages['low_hum']
         if tips_wanted:
             label += '\n' + constants.messages['low_hum_tip']
-    elif humidity is not None and constants.HUM_MIN < humidity < constants.HUM_MAX:
+    elif humidity is not None and settings.hum_min < humidity < settings.hum_max:
         label += constants.messages['normal_hum']
-    elif humidity is not None and humidity > constants.HUM_MAX:
+    elif humidity is not None and humidity > settings.hum_max:
         label += constants.messages['high_hum']
         if tips_wanted:
             label += '\n' + constants.messages['high_hum_tip']
@@ -125,13 +243,13 @@ def construct_labels(measure=None, value=None, temp=None, humidity=None, light=N
 
     if light is not None:
         label += f'{light} lux - '
-    if light is not None and light < constants.LUX_MIN:
+    if light is not None and light < settings.lux_min:
         label += constants.messages['low_light']
         if tips_wanted:
             label += '\n' + constants.messages['low_light_tip']
-    elif light is not None and constants.LUX_MIN < light < constants.LUX_MAX:
+    elif light is not None and settings.lux_min < light < settings.lux_max:
         label += constants.messages['normal_light']
-    elif light is not None and light > constants.LUX_MAX:
+    elif light is not None and light > settings.lux_max:
         label += constants.messages['high_light']
         if tips_wanted:
             label += '\n' + constants.messages['high_light_tip']
@@ -140,13 +258,13 @@ def construct_labels(measure=None, value=None, temp=None, humidity=None, light=N
 
     if pressure is not None:
         label += f'{pressure} Pa - '
-    if pressure is not None and pressure < constants.PRES_MIN:
+    if pressure is not None and pressure < settings.pres_min:
         label += constants.messages['low_pressure']
         if tips_wanted:
             label += '\n' + constants.messages['low_pressure_tip']
-    elif pressure is not None and constants.PRES_MIN < pressure < constants.PRES_MAX:
+    elif pressure is not None and settings.pres_min < pressure < settings.pres_max:
         label += constants.messages['normal_pressure']
-    elif pressure is not None and pressure > constants.PRES_MAX:
+    elif pressure is not None and pressure > settings.pres_max:
         label += constants.messages['high_pressure']
         if tips_wanted:
             label += '\n' + constants.messages['high_pressure_tip']
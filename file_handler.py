@@ -2,208 +2,474 @@
 
 This file contains methods used for file and directory handling, for purposes of running this application.
 
+Readings are collected from every configured device (see devices.py), read by a single asyncio loop (async_reader.py)
+or, with SERIAL_READER set to 'thread', by a thread per device.
+Functions taking a device default to the default device (SERIAL_PORT).
+
 It can also be imported as a module and contains the following
 methods:
     * folder_prep - makes CSV folder and/or files on specified location, if necessary
-    * wait_for_file_input - waits for file to be not-empty before making plots
     * impl_circular_buffer - treats each sensor's CSV as a circular buffer with BUFFER_MINUTES length
-    * store_to_csv - listens to serial port and writes values to appropriate CSV files
-    * write_to_config - updates config.ini (and app functionalities) when called
+    * fill_buffers - fills in-memory sensor buffers with readings appended to CSV files since the previous fill
+    * skip_stored - moves followers of a device's files past readings stored while it was connected
+    * collector_running - checks whether a headless collector (collector.py) is storing serial values
+    * publish_rings - publishes stored readings to shared memory rings, read by attached apps
+    * attach_rings - attaches to shared memory rings published by a running collector
+    * read_ring - returns readings published to a shared memory ring since the previous read
+    * close_rings - detaches from (or frees) shared memory rings
+    * store_reading - writes a decoded reading to appropriate CSV file, history and sensor buffer
+    * open_storage - opens CSV writer and history shared by all devices
+    * store_to_csv - listens to serial port and stores decoded readings
+    * store_chunk - decodes bytes read from serial port and stores the readings
+    * close_writer - stops storing serial values and flushes pending lines to CSV files and history
+    * write_to_config - updates settings and config.ini when called
+    * apply_settings - applies changed settings to detectors and the serial port, called whenever they change
     * check_serial_connection - check if SERIAL_PORT Arduino communication available
-    * connect_to_serial - connect to Arduino communication on SERIAL_PORT if available
-    * check_pressure_diffs - detects significant pressure differences that could mean door/window opening
+    * connect_to_serial - start monitoring ports of all devices and storing their values, connecting whenever available
+    * check_pressure_diffs - returns time of door/window opening detected from pressure differences, if any
 """
 import os
 import threading
-from configparser import SafeConfigParser
 import time
 from datetime import datetime
 
-import pandas as pd
-import serial.tools.list_ports
-from future.backports.datetime import timedelta
+import serial
 
 import constants
-import element_constructor as ec
+import sensor_buffer as sb
+import sensor_writer as sw
+import devices as dv
+import csv_follower as cf
+import history_store as hs
+import instrumentation as im
+import shared_ring as sr
+import async_reader as ar
+import settings as st
+
+writer = None  # sensor writer used by serial threads, opened on first store
+history = None  # long-term history store used by serial threads, opened on first store
+storage_lock = threading.Lock()  # serial threads of all devices open writer and history on first store
+fill_lock = threading.Lock()  # followers and rings are read by one fill_buffers call at a time
+serial_stopped = threading.Event()  # set when serial values should no longer be stored
+reader = None  # asyncio reader of all devices' ports, started by connect_to_serial if SERIAL_READER is 'async'
+devices = dv.make_devices()  # device name : Device
+default_device = devices[constants.DEFAULT_DEVICE]
+port_monitor = default_device.port_monitor  # cached SERIAL_PORT connection state
+pressure_detector = default_device.pressure_detector  # door/window opening detector fed with pressure readings
+decoder = default_device.decoder  # decodes bytes read from serial into readings
+attached = False  # True if the app shows readings stored by a running collector instead of reading serial
+followers = {filepath: cf.CsvFollower(filepath)
+             for device in devices.values() for filepath in device.streams.values()}  # fill_buffers
+rings = {}  # filepath : SharedRing - published by a collector, or attached to by an app
+rings_owner = None  # process ID of the collector whose rings are attached to
+ring_generations = {}  # filepath : generation of attached ring to read from next
 
 
 def folder_prep():
     """ Prepare and/or modify folder and file locations for sensor readings. """
 
-    # make csv folder if it doesn't exist
-    if not os.path.exists(constants.csv_folder):
-        os.makedirs(constants.csv_folder)
+    for device in constants.devices.values():
+        # make csv folder if it doesn't exist
+        if not os.path.exists(device['csv']):
+            os.makedirs(device['csv'])
+
+        # populate csv folder with specified files if they don't exist
+        for filepath in device['streams'].values():
+            if not os.path.exists(filepath):
+                open(filepath, 'a').close()
+
+
+@im.timed('check_pressure_diffs')
+def check_pressure_diffs():
+    """ Return HH:MM time of door/window opening detected since the previous check, or '' if there was none.
+        Openings are detected by pressure detectors of devices as pressure readings arrive.
+        If the latest one was detected by other than the default device, its name is added to the time.
+    """
+
+    events = [(device.pressure_detector.take_event(), name) for name, device in devices.items()]
+    timestamp, name = max([event for event in events if event[0] is not None], default=(None, None))
+    if timestamp is None:
+        return ''
 
-    # populate csv folder with specified files if it's empty
-    if len(os.listdir(constants.csv_folder)) == 0:
-        open(constants.tmp116_csv, 'a').close()
-        open(constants.hdc2010_temp_csv, 'a').close()
-        open(constants.hdc2010_hum_csv, 'a').close()
-        open(constants.opt3001_csv, 'a').close()
-        open(constants.dps310_temp_csv, 'a').close()
-        open(constants.dps310_pressure_csv, 'a').close()
+    formatted = datetime.fromtimestamp(timestamp).strftime('%H:%M')
+    return formatted if name == constants.DEFAULT_DEVICE else f'{formatted} ({name})'
 
 
-def wait_for_file_input(filepath):
-    """ Wait for file to be non-empty before plotting its data.
-        This is to avoid a possible bug when plotting
+@im.timed('impl_circular_buffer')
+def impl_circular_buffer(filepath):
+    """ Treat csv file as a circular buffer with BUFFER_MINUTES size.
 
         Arguments:
-            filepath - location of the file waiting for input
+            filepath - location of the file being modified
     """
 
-    while ((os.path.exists(filepath) and os.stat(filepath).st_size == 0)
-           or not os.path.exists(filepath)):
-        pass
+    # skip rewriting file if its oldest line is still newer than BUFFER_MINUTES minutes
+    first = cf.read_first_record(filepath)
+    if first is None or time.time() - first[0] < constants.BUFFER_MINUTES * 60:
+        return
+
+    # open file, store lines newer than BUFFER_MINUTES minutes to list
+    # discard older lines
+    with open(filepath, 'r') as file:
+        lines = []  # list of file lines
+        oldest = time.time() - constants.BUFFER_MINUTES * 60  # oldest time kept
+
+        for row in file:
+            field, _, rest = row.partition(',')
+            timestamp = cf.parse_time(field)  # get timestamp from row
 
+            # append to lines only rows newer than BUFFER_MINUTES minutes
+            if timestamp > oldest:
+                # rows written by older versions are migrated to epoch milliseconds
+                lines.append(row if field.isdigit() else f'{round(timestamp * 1000)},{rest}')
 
-def check_pressure_diffs():
-    """ Detect significant pressure differences that could mean door/window opening. """
+    # write lines to file
+    with open(filepath, 'w') as file:
+        file.writelines(lines)
 
-    # read pressure csv and convert values to datetime
-    pressure_data = pd.read_csv(constants.dps310_pressure_csv, names=constants.headers)
-    pressure_data['Vrijeme'] = pd.to_datetime(pressure_data['Vrijeme'], format='%d/%m/%Y %H:%M:%S')
+    # the file is read from the start again when followed, not from an offset into lines that were dropped
+    follower = followers.get(filepath)
+    if follower is not None:
+        with fill_lock:
+            follower.invalidate()
+
+
+@im.timed('fill_buffers')
+def fill_buffers(names=None):
+    """ Fill sensor buffers with readings stored in CSV files, e.g. those from previous app runs.
+        Files are followed, so only readings appended since the previous fill are parsed. This makes it cheap
+        to call repeatedly to follow files written outside this app instance (e.g. by a collector)
+        while it has no device connected. If attached to a collector that publishes shared memory rings,
+        new readings are taken from the rings instead, without parsing CSV text.
+        New pressure readings are passed to the door/window opening detector.
+        Buffers of connected devices are skipped, they are filled as readings arrive. When a device disconnects,
+        its files are followed on from their end (see skip_stored), so those readings aren't added again.
+        Calls are serialized, so concurrent fills (e.g. from the Tk thread and a scheduler thread) don't both
+        append the same readings.
 
-    # construct PRESSURE_INTERVAL_SECS duration datetime object to be added to times
-    seconds_delta = timedelta(seconds=constants.PRESSURE_INTERVAL_SECS)
+        Arguments:
+            names - names of devices whose buffers are filled; default all
+    """
 
-    # add PRESSURE_INTERVAL_SECONDS to 'Vrijeme' in all rows
-    pressure_data['Vrijeme'] = pressure_data['Vrijeme'] + seconds_delta
+    # called from the scheduler's worker thread and the Tk thread - followers mustn't read the same lines twice
+    with fill_lock:
+        use_rings = attached and attach_rings()
+        filling = [devices[name] for name in names] if names is not None else devices.values()
 
-    # filter out readings from last PRESSURE_INTERVAL_SECS seconds
-    pressure_data_nsecs = pressure_data[pressure_data['Vrijeme'] > datetime.now()]
+        for device in filling:
+            if device.port_monitor.is_connected():
+                continue
 
-    # filter out rows with min and max pressure values
-    max_value_row = pressure_data_nsecs[pressure_data_nsecs['Vrijednost'] == pressure_data_nsecs['Vrijednost'].max()]
-    min_value_row = pressure_data_nsecs[pressure_data_nsecs['Vrijednost'] == pressure_data_nsecs['Vrijednost'].min()]
+            for filepath in device.streams.values():
+                buffer = sb.get_buffer(filepath)
+                try:
+                    latest = buffer.last_time()
+                except IndexError:
+                    latest = None
 
-    # return at what time the dip/increase in pressure happened
-    if not max_value_row.empty and not min_value_row.empty:
+                if use_rings and filepath in rings:
+                    readings, reset = read_ring(filepath, latest), False
+                else:
+                    readings, reset = followers[filepath].read_new()
 
-        # there can be multiple rows w/ same min/max value
-        # return the first one because the HH:MM value would be same either way
-        if max_value_row['Vrijednost'].iloc[0] - min_value_row['Vrijednost'].iloc[0] > constants.PRESSURE_DIFF_PA:
+                if reset:
+                    buffer.clear()
+                for timestamp, value in readings:
+                    buffer.append(timestamp, value)
 
-            # return the sooner timestamp in HH:MM format or '' if not applicable
-            if max_value_row['Vrijeme'].iloc[0] < min_value_row['Vrijeme'].iloc[0]:
-                return max_value_row['Vrijeme'].iloc[0].strftime('%H:%M')
-            else:
-                return min_value_row['Vrijeme'].iloc[0].strftime('%H:%M')
-        else:
-            return ''
-    return ''
+                    # files are read from the start again after retention, readings seen before are not passed again
+                    if filepath == device.pressure_csv and (latest is None or timestamp > latest):
+                        device.pressure_detector.add(timestamp, value)
 
 
-def impl_circular_buffer(filepath):
-    """ Treat csv file as a circular buffer with BUFFER_MINUTES size.
+def skip_stored(device):
+    """ Move followers of a device's files to their end. Called when the device disconnects - readings stored
+        while it was connected are already in buffers, so they must not be read from its files again.
 
         Arguments:
-            filepath - location of the file being modified
+            device - Device that disconnected
     """
 
-    # open file, store lines newer than 10 minutes to list
-    # discard older lines
-    with open(filepath, 'r') as file:
-        lines = []  # list of file lines
-        now = datetime.now()  # current time
+    if writer is not None:
+        writer.flush()  # so pending lines are skipped too
+    with fill_lock:
+        for filepath in device.streams.values():
+            followers[filepath].skip_to_end()
 
-        for row in file.readlines():
-            data = row.split(',')
-            timestamp = datetime.strptime(data[0], '%d/%m/%Y %H:%M:%S')  # get timestamp from row
 
-            time_delta = now - timestamp  # calculate difference between row time and current time
-            seconds_delta = time_delta.total_seconds()  # -> to seconds
-            minutes_delta = seconds_delta / 60  # -> to minutes
+def collector_running():
+    """ Return True if a collector (collector.py) is running, i.e. its heartbeat file was recently updated. """
 
-            # append to lines only rows newer than BUFFER_MINUTES minutes
-            if minutes_delta < constants.BUFFER_MINUTES:
-                lines.append(row)
-    file.close()
+    try:
+        age = time.time() - os.path.getmtime(constants.COLLECTOR_FILE)
+    except OSError:
+        return False
+
+    return age < constants.COLLECTOR_HEARTBEAT_SECS * 3
 
-    # write lines to file
-    with open(filepath, 'w') as file:
-        file.writelines(lines)
 
+def publish_rings():
+    """ Make a shared memory ring for each sensor stream, to which stored readings are published.
+        Called by the collector.
+    """
 
-def store_to_csv():
-    """ Store lines from serial port to respective CSV files. """
+    for device in devices.values():
+        for stream, filepath in device.streams.items():
+            rings[filepath] = sr.SharedRing(sr.ring_name(stream, device.name), create=True)
 
-    with open(constants.tmp116_csv, 'a', newline='') as tmp116_file, \
-            open(constants.hdc2010_temp_csv, 'a', newline='') as hdc2010_temp_file, \
-            open(constants.hdc2010_hum_csv, 'a', newline='') as hdc2010_hum_file, \
-            open(constants.opt3001_csv, 'a', newline='') as opt3001_file, \
-            open(constants.dps310_temp_csv, 'a', newline='') as dps310_temp_file, \
-            open(constants.dps310_pressure_csv, 'a', newline='') as dps310_pressure_file:
 
-        try:
-            line = constants.serial.readline()  # read a byte string
-
-            now = datetime.now()
-            dt_string = now.strftime("%d/%m/%Y %H:%M:%S")
-
-            if line:
-                string = line.decode()  # convert the byte string to a unicode string
-                split_string = string.split(', ')
-
-                # choose write file location based on sensor name and value
-                # add current time to record
-                if split_string[0] == 'TMP116':
-                    tmp116_file.write(dt_string + ', ' + string)
-                elif split_string[0] == 'HDC2010' and split_string[1] == 'temperature':
-                    hdc2010_temp_file.write(dt_string + ', ' + string)
-                elif split_string[0] == 'HDC2010' and split_string[1] == 'humidity':
-                    hdc2010_hum_file.write(dt_string + ', ' + string)
-                elif split_string[0] == 'OPT3001':
-                    opt3001_file.write(dt_string + ', ' + string)
-                elif split_string[0] == 'DPS310' and split_string[1] == 'temperature':
-                    dps310_temp_file.write(dt_string + ', ' + string)
-                elif split_string[0] == 'DPS310' and split_string[1] == 'pressure':
-                    dps310_pressure_file.write(dt_string + ', ' + string)
-        except AttributeError:
+def attach_rings():
+    """ Attach to shared memory rings published by a running collector, again if the collector was restarted.
+        Return True if attached to any.
+    """
+
+    global rings_owner
+
+    try:
+        with open(constants.COLLECTOR_FILE) as file:
+            owner = file.read().strip()
+    except OSError:
+        owner = None
+
+    if owner is not None and owner == rings_owner:
+        return bool(rings)
+
+    close_rings()
+    rings_owner = owner
+    if owner is None:
+        return False
+
+    for device in devices.values():
+        for stream, filepath in device.streams.items():
+            try:
+                rings[filepath] = sr.SharedRing(sr.ring_name(stream, device.name))
+            except FileNotFoundError:
+                continue
+
+    return bool(rings)
+
+
+def read_ring(filepath, latest):
+    """ Return list of (epoch, value) readings published to ring of filepath since the previous read.
+        On the first read after attaching, readings already read from the CSV file are left out.
+
+        Arguments:
+            filepath - location of the sensor's CSV file
+            latest - epoch time of the newest reading in the sensor's buffer, None if it's empty
+    """
+
+    generation = ring_generations.get(filepath)
+    times, values, ring_generations[filepath] = rings[filepath].read_since(generation or 0)
+    readings = list(zip(times.tolist(), values.tolist()))
+
+    if generation is None and latest is not None:
+        readings = [(timestamp, value) for timestamp, value in readings if timestamp > latest]
+
+    return readings
+
+
+def close_rings():
+    """ Detach from shared memory rings; if they were published by this process, free them. """
+
+    closing = list(rings.values())
+    rings.clear()  # stop publishing before closing
+    ring_generations.clear()
+    for ring in closing:
+        ring.close()
+
+
+def store_reading(reading, timestamp, device=None):
+    """ Store a decoded serial reading to its CSV file, history and sensor buffer,
+        and pass pressure readings to the door/window opening detector.
+
+        Arguments:
+            reading - serial_protocol.Reading
+            timestamp - epoch time of the reading
+            device - Device the reading was read from; default the default device
+    """
+
+    if device is None:
+        device = default_device
+
+    stream = (reading.sensor, reading.quantity)
+    filepath = device.streams.get(stream)
+    if filepath is None:
+        return
+
+    # CSV files keep epoch milliseconds; times are formatted only when shown
+    millis = round(timestamp * 1000)
+    timestamp = millis / 1000  # buffers, history and rings get the same time as the CSV file
+    writer.write(filepath, f'{millis}, {reading.sensor}, {reading.quantity}, {reading.value:.2f}\n')
+    history.add(device.history_stream(stream), timestamp, reading.value)
+    sb.get_buffer(filepath).append(timestamp, reading.value)
+
+    ring = rings.get(filepath)
+    if ring is not None:
+        ring.append(timestamp, reading.value)
+
+    if filepath == device.pressure_csv:
+        device.pressure_detector.add(timestamp, reading.value)
+
+
+def open_storage():
+    """ Open CSV writer (for files of all devices) and history, if they aren't open yet. """
+
+    global writer, history
+
+    with storage_lock:
+        if writer is None:
+            writer = sw.SensorWriter([filepath for device in devices.values() for filepath in device.streams.values()])
+        if history is None:
+            history = hs.HistoryStore()
+
+
+def store_to_csv(device=None, wait=True):
+    """ Store readings from serial port to respective CSV files, history and sensor buffers.
+        All bytes waiting on the port are read and decoded at once.
+
+        Arguments:
+            device - Device whose port is read; default the default device
+            wait - if nothing is waiting, wait (up to serial timeout) for it; if False, return right away
+    """
+
+    if device is None:
+        device = default_device
+    if writer is None or history is None:
+        open_storage()
+
+    port = device.port_monitor.serial
+    try:
+        # wait (up to serial timeout) for at least one byte if asked to, then take everything that arrived
+        waiting = port.in_waiting
+        if not waiting and not wait:
             return
+        chunk = port.read(max(waiting, 1))
+    except serial.SerialException:
+        device.port_monitor.report_failure()  # device was unplugged while reading, let monitor reconnect
+        device.decoder.reset()
+        return
+    except AttributeError:
+        return
+
+    store_chunk(chunk, device)
+
+
+@im.timed('store_chunk')
+def store_chunk(chunk, device=None):
+    """ Decode bytes read from serial port of a device and store the readings. Timed apart from store_to_csv,
+        so time spent waiting for bytes to arrive doesn't count as storing them.
+
+        Arguments:
+            chunk - bytes read from the port
+            device - Device the bytes were read from; default the default device
+    """
+
+    if device is None:
+        device = default_device
+
+    now = time.time()
+    readings = device.decoder.feed(chunk)
+
+    # binary frames carry device millis, so readings received together keep their relative timing
+    # the last one received is taken as now; millis wrap around every 2 ** 32 ms (about 49.7 days)
+    latest_millis = next((reading.millis for reading in reversed(readings) if reading.millis is not None), None)
+
+    for reading in readings:
+        if reading.millis is None:
+            store_reading(reading, now, device)
+            continue
 
+        age = (latest_millis - reading.millis) % 2 ** 32
+        if age >= 2 ** 31:
+            age = 0  # newer than the last reading - the device was reset in between
+        store_reading(reading, now - age / 1000, device)
 
-def thread_serial():
-    """ Thread used to continuously store incoming values from serial to csv if device connected """
 
-    while True:
-        if check_serial_connection():
-            store_to_csv()
+def thread_serial(device=None):
+    """ Thread used to continuously store incoming values from serial of a device to csv if device connected.
+        Every RETENTION_INTERVAL_SECS, device's CSV files are trimmed to BUFFER_MINUTES length,
+        and history older than its retention periods is deleted.
+        Errors are reported and reading goes on, so other devices' threads and the app aren't affected.
 
+        Arguments:
+            device - Device whose port is read; default the default device
+    """
 
-def check_serial_connection():
-    """ Return True if SERIAL_PORT active, False if not. """
+    if device is None:
+        device = default_device
 
-    # check if port defined as SERIAL_PORT has a device connected to it
-    ports = [tuple(p)[0] for p in list(serial.tools.list_ports.comports())]
-    arduino_port = [port for port in ports if constants.SERIAL_PORT in port]
+    last_retention = time.monotonic()
 
-    # start serial communication if connected
-    if arduino_port:
-        return True
+    while not serial_stopped.is_set():
+        try:
+            if device.port_monitor.wait_connected(constants.PORT_POLL_SECS):
+                store_to_csv(device)
+                writer.flush_if_due()
+                history.flush_if_due()
+
+                if time.monotonic() - last_retention >= constants.RETENTION_INTERVAL_SECS:
+                    writer.flush()
+                    for filepath in device.streams.values():
+                        impl_circular_buffer(filepath)
+                    history.prune()
+                    last_retention = time.monotonic()
+        except Exception as exception:
+            print(f'Storing readings of device {device.name} failed: {exception!r}')
+            serial_stopped.wait(constants.PORT_POLL_SECS)
+
+
+def close_writer():
+    """ Stop storing serial values and flush pending lines to CSV files and history. Called when the app exits. """
+
+    serial_stopped.set()
+    if reader is not None:
+        reader.stop(constants.PORT_POLL_SECS + 1)
+    for device in devices.values():
+        if device.thread is not None:
+            device.thread.join(constants.PORT_POLL_SECS + 1)  # let it finish storing what it has read
+    if writer is not None:
+        writer.close()
+    if history is not None:
+        history.close()
+
+
+def check_serial_connection(device=None):
+    """ Return True if SERIAL_PORT (or port of passed device) active, False if not.
+        Connection state is cached by port_monitor, so this is cheap to call.
+    """
 
-    return False
+    return (device or default_device).port_monitor.is_connected()
 
 
 def connect_to_serial():
-    """ Connect to serial port if available. """
+    """ Start monitoring ports of all devices and storing their values, from the asyncio reader
+        or from a separate thread per device (SERIAL_READER).
+    """
+
+    global reader
 
-    # check if port defined as SERIAL_PORT has a device connected to it
-    if check_serial_connection():
-        constants.serial.reset_input_buffer()  # clear input serial buffer
+    if constants.SERIAL_READER == 'async' and reader is None:
+        started = ar.AsyncReader(devices.values())
+        started.start()  # raises if storage can't be opened, so the app doesn't wait for readings forever
+        reader = started
 
-        time.sleep(1)  # small delay to stabilise
-        threading.Thread(target=thread_serial, daemon=True).start()  # start thread
+    for device in devices.values():
+        device.port_monitor.start()
 
-    # if not, print a message to console
-    else:
-        print(f'Serial port {constants.SERIAL_PORT} unavailable. '
-              f'Connect your device to {constants.SERIAL_PORT} or redefine SERIAL_PORT.')
+        if constants.SERIAL_READER != 'async' and device.thread is None:
+            device.thread = threading.Thread(target=thread_serial, args=(device,), daemon=True)
+            device.thread.start()  # start thread
+
+        # if device isn't connected, print a message to console
+        if not device.port_monitor.is_connected():
+            port = device.port_monitor.port
+            print(f'Serial port {port} unavailable. '
+                  f'Connect your device to {port} or redefine SERIAL_PORT.')
 
 
 def write_to_config(values):
-    """ Stores values from Update Page to config.ini.
-        Calls for reload of constants.py module where necessary in order to update whole app.
+    """ Stores values from Update Page to settings, which write them to config.ini.
+        Changed values take effect right away - labels use current settings, and apply_settings is called.
 
         Parameters
         ----------
@@ -211,22 +477,32 @@ def write_to_config(values):
             A dictionary of {min/max reading : min/max value, serial_port : port name}.
     """
 
-    config_parser = SafeConfigParser()
-    config_parser.read('config.ini')
+    st.current.update({key.lower(): value for key, value in values.items()})
 
-    serial_port_old = config_parser['updatable']['serial_port']  # old serial port in case of port reconnection
 
-    # set values in [updatable] section to those passed as argument
-    for key, value in values.items():
-        config_parser.set('updatable', key, value)
+def apply_settings(changed):
+    """ Apply changed settings to door/window opening detectors of all devices and to the default device's port.
+        The port is only reconnected if it changed.
 
-    # write changes to 'config.ini'
-    with open('config.ini', 'w') as configfile:
-        config_parser.write(configfile)
+        Arguments:
+            changed - {setting : new value} of settings that changed
+    """
 
-    ec.reload_constants()  # update values (min/max) for element construction
+    if 'pressure_diff_pa' in changed:
+        for device in devices.values():
+            device.pressure_detector.threshold = changed['pressure_diff_pa']
 
     # if serial port changed, reconnect to new port
-    serial_port_new = config_parser['updatable']['serial_port']
-    if serial_port_old != serial_port_new:
+    # a collector reads serial on its own, it uses the new port once restarted
+    if 'serial_port' in changed and attached:
+        print(f"Restart the collector to read {changed['serial_port']}.")
+    elif 'serial_port' in changed:
+        port_monitor.set_port(changed['serial_port'])
         connect_to_serial()
+
+
+st.current.subscribe(apply_settings)  # settings changed on update page apply without restart
+
+# files of a device that disconnects are followed on from their end
+for device in devices.values():
+    device.port_monitor.add_callback(lambda connected, device=device: connected or skip_stored(device))
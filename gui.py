@@ -5,21 +5,44 @@ This file contains the app (Tk) class, and the main method which starts the GUI
 Running both simultaneously makes use of multithreading.
 If serial communication is available, a separate thread is started
 from file_handler.py to run the serial communication.
+Periodic page updates prepare their data in a thread pool (update_scheduler.py),
+while widgets are only ever updated from the Tk thread.
+If a collector (collector.py) is running, the app doesn't read serial itself, and only shows readings
+the collector stores.
+Pages are only made (and their graphs drawn) when first shown, and periodic updates only redraw the shown page.
+Hidden pages are marked dirty instead, and redrawn once when they are shown again.
+The window is shown first, before stored readings, pandas and matplotlib are loaded and serial ports are opened.
 
 This file is the starting point of the app. It creates the folder and files sensor readings will be stored into,
 starts serial communication with the Arduino Micro, and starts the app.
 It also defines all methods necessary for runtime app use.
 """
 import sys
-import threading
+import time
 import tkinter as tk
-import matplotlib
 
+import instrumentation as im  # first, startup is timed from its import
 import file_handler as fh
 import pages as pg
 import constants
-
-matplotlib.use("TkAgg")
+import sensor_buffer as sb
+import settings as st
+import update_scheduler as us
+
+
+# sensor pages and arguments of their update_data: files, values, measures, titles, color
+sensor_pages = {pg.TMP116Page: ([constants.tmp116_csv], [constants.temp_string], [constants.temp_measurement],
+                                [constants.temp_name], -1),
+                pg.HDC2010Page: ([constants.hdc2010_temp_csv, constants.hdc2010_hum_csv],
+                                 [constants.temp_string, constants.hum_string],
+                                 [constants.temp_measurement, constants.hum_measurement],
+                                 [constants.temp_name, constants.hum_name], 3),
+                pg.OPT3001Page: ([constants.opt3001_csv], [constants.light_string], [constants.light_measurement],
+                                 [constants.light_name], 4),
+                pg.DPS310Page: ([constants.dps310_temp_csv, constants.dps310_pressure_csv],
+                                [constants.temp_string, constants.pressure_string],
+                                [constants.temp_measurement, constants.pressure_measurement],
+                                [constants.temp_name, constants.pressure_name], 5)}
 
 
 class SensorCentral(tk.Tk):
@@ -29,119 +52,235 @@ class SensorCentral(tk.Tk):
         Attributes
         ----------
         frames : dict
-            Contains all pages in app.
+            Contains pages in app made so far. Pages are made when first shown.
             key - SensorPage or StartPage (child) object
             value - instance of that page in app
 
+        shown : type
+            Page currently shown.
+
+        dirty : set
+            Pages whose periodic updates were skipped while hidden. They are redrawn once when shown again.
+
         Methods
         -------
         show_frame(self, content)
-            Raise the frame passed as 'content'.
+            Raise the frame passed as 'content', making it first if it wasn't shown before.
+            A dirty page is redrawn.
 
-        app_update(self)
+        draw_start_page(self)
+            Wait for first readings (without blocking the Tk thread) and draw start page graphs,
+            once the window is shown.
+
+        prepare_app_update(self), prepare_sensor_update(self)
+            Collect data for app_update/sensor_update. Called from worker threads, doesn't touch widgets.
+
+        app_update(self, data=None)
             Call update on start page and check for door/window openings.
             As specified in main, this is called every START_UPDATE_INTERVAL_SECS s.
             Additionally, this is called on every update called from update page.
 
-        sensor_update(self)
-            Call update on sensor pages.
+        sensor_update(self, data=None)
+            Call update on the shown sensor page; other sensor pages that were made are marked dirty.
             As specified in main, this is called every SENSOR_UPDATE_INTERVAL_SECS s.
             Additionally, this is called on every update called from update page.
-    """
 
-    frames = {}
+        widget_count(self)
+            Return number of widgets in app. Pages make their widgets once, so updates don't change it.
+    """
 
     def __init__(self, *args, **kwargs):
         tk.Tk.__init__(self, *args, **kwargs)
 
+        self.frames = {}
+        self.shown = None
+        self.dirty = set()
+
         tk.Tk.wm_title(self, constants.APP_NAME)
 
         # make app window as big as screen
         w, h = self.winfo_screenwidth(), self.winfo_screenheight()
         self.geometry("%dx%d+0+0" % (w, h))
 
-        container = tk.Frame(self)
-        container.pack(side="top", fill="both", expand=True)
-        container.grid_rowconfigure(0, weight=1)
-        container.grid_columnconfigure(0, weight=1)
+        self.container = tk.Frame(self)
+        self.container.pack(side="top", fill="both", expand=True)
+        self.container.grid_rowconfigure(0, weight=1)
+        self.container.grid_columnconfigure(0, weight=1)
+
+        # other pages are made when first shown
+        # start page graphs are drawn by draw_start_page, once the window is shown
+        self.show_frame(pg.StartPage)
+
+    def draw_start_page(self, deadline=None):
+        """ Draw start page graphs. Called once the window is shown, as making them loads matplotlib.
+            If serial connection is available, first readings are waited for by checking buffers every
+            UPDATE_POLL_MS from the Tk event loop, so the window stays responsive meanwhile.
+
+            Arguments:
+                deadline - monotonic time waiting for first readings ends at; set on the first call
+        """
+
+        # wait for first readings if serial connection available
+        # pages of sensors that haven't reported in STARTUP_WAIT_SECS are shown without their data
+        if deadline is None:
+            deadline = time.monotonic() + (constants.STARTUP_WAIT_SECS if fh.check_serial_connection() else 0)
+
+        missing = [filepath for filepath in [constants.dps310_temp_csv, constants.tmp116_csv,
+                                             constants.hdc2010_temp_csv, constants.hdc2010_hum_csv]
+                   if not sb.get_buffer(filepath).ready.is_set()]
+        if missing and time.monotonic() < deadline:
+            self.after(constants.UPDATE_POLL_MS, self.draw_start_page, deadline)
+            return
 
-        # wait for file inputs to stabilise if serial connection available
         if fh.check_serial_connection():
-            fh.wait_for_file_input(constants.dps310_temp_csv)
-            fh.wait_for_file_input(constants.tmp116_csv)
-            fh.wait_for_file_input(constants.hdc2010_temp_csv)
-            fh.wait_for_file_input(constants.hdc2010_hum_csv)
-
-        for page in [pg.StartPage, pg.TMP116Page, pg.HDC2010Page, pg.OPT3001Page, pg.DPS310Page, pg.UpdatePage]:
-            frame = page(container, self)
-            self.frames[page] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
+            for filepath in missing:
+                print(f'No readings received for {filepath} in {constants.STARTUP_WAIT_SECS} s.')
 
-        self.show_frame(pg.StartPage)
+        frame = self.frames[pg.StartPage]
+        pg.StartPage.init_plots(frame)
+        pg.StartPage.update_start_data(frame)
+
+        im.startup_stage('graphs drawn')
+        report_startup()
 
     def show_frame(self, content):
-        frame = self.frames[content]
+        frame = self.frames.get(content)
+        if frame is None:
+            frame = content(self.container, self)  # pages draw their graphs when made
+            self.frames[content] = frame
+            frame.grid(row=0, column=0, sticky="nsew")
+        elif content in self.dirty:
+            self.render(content)
+
+        self.shown = content
         frame.tkraise()
 
-    def app_update(self):
-        pg.StartPage.update_start_data(self.frames[pg.StartPage])
-        self.pressure_update()
-
-    def sensor_update(self):
-        pg.TMP116Page.update_data(self.frames[pg.TMP116Page],
-                                  [constants.tmp116_csv], [constants.temp_string], [constants.temp_measurement],
-                                  [constants.temp_name])
-
-        pg.HDC2010Page.update_data(self.frames[pg.HDC2010Page],
-                                   [constants.hdc2010_temp_csv, constants.hdc2010_hum_csv],
-                                   [constants.temp_string, constants.hum_string],
-                                   [constants.temp_measurement, constants.hum_measurement],
-                                   [constants.temp_name, constants.hum_name], 3)
-
-        pg.OPT3001Page.update_data(self.frames[pg.OPT3001Page],
-                                   [constants.opt3001_csv], [constants.light_string], [constants.light_measurement],
-                                   [constants.light_name], 4)
-
-        pg.DPS310Page.update_data(self.frames[pg.DPS310Page],
-                                  [constants.dps310_temp_csv, constants.dps310_pressure_csv],
-                                  [constants.temp_string, constants.pressure_string],
-                                  [constants.temp_measurement, constants.pressure_measurement],
-                                  [constants.temp_name, constants.pressure_name], 5)
-
-    def pressure_update(self):
-        time = fh.check_pressure_diffs()
+    def render(self, page):
+        """ Redraw a page whose updates were skipped while it was hidden. """
+
+        self.dirty.discard(page)
+        if page is pg.StartPage:
+            pg.StartPage.update_start_data(self.frames[page])
+        elif page is pg.DiagnosticsPage:
+            pg.DiagnosticsPage.update_data(self.frames[page])
+        else:
+            page.update_data(self.frames[page], *sensor_pages[page])
+
+    @im.timed('prepare_app_update')
+    def prepare_app_update(self):
+        # without a device, show readings from CSV files in case they are written outside this app instance
+        # only the shown device's files are followed, so updates don't get slower with more devices
+        fh.fill_buffers([sb.selected])
+
+        # start page data is only collected while it is shown
+        shown = self.shown is pg.StartPage
+        return {'start': pg.StartPage.collect_start_data(self.frames[pg.StartPage]) if shown else None,
+                'doors': fh.check_pressure_diffs(),
+                'latest': sb.latest_time([sb.shown(filepath) for filepath in constants.streams.values()])}
+
+    @im.timed('app_update')
+    def app_update(self, data=None):
+        if data is None:
+            data = self.prepare_app_update()
+
+        if data['start'] is not None:
+            pg.StartPage.update_start_data(self.frames[pg.StartPage], data['start'])
+        else:
+            self.dirty.add(pg.StartPage)
+        self.pressure_update(data['doors'])
+
+        if im.enabled:
+            if data['start'] is not None:
+                self.update_idletasks()  # lag is measured once updated widgets are drawn
+                im.record_lag('lag/start_page', data['latest'])
+            if self.shown is pg.DiagnosticsPage:
+                pg.DiagnosticsPage.update_data(self.frames[pg.DiagnosticsPage])
+            elif pg.DiagnosticsPage in self.frames:
+                self.dirty.add(pg.DiagnosticsPage)
+
+    @im.timed('prepare_sensor_update')
+    def prepare_sensor_update(self):
+        # only the shown sensor page is updated
+        page = self.shown
+        data = {page: page.collect_data(self.frames[page], *sensor_pages[page][:3])} if page in sensor_pages else {}
+        data['latest'] = sb.latest_time([sb.shown(filepath) for filepath in constants.streams.values()])
+        return data
+
+    @im.timed('sensor_update')
+    def sensor_update(self, data=None):
+        if data is None:
+            data = self.prepare_sensor_update()
+
+        for page, args in sensor_pages.items():
+            if page in data:
+                page.update_data(self.frames[page], *args, data=data[page])
+            elif page in self.frames:
+                self.dirty.add(page)  # hidden, redrawn when shown again
+
+        if im.enabled and any(page in data for page in sensor_pages):
+            self.update_idletasks()
+            im.record_lag('lag/sensor_pages', data['latest'])
+
+    def widget_count(self):
+        """ Return number of widgets in app, which should stay the same between updates. """
+
+        widgets = self.winfo_children()
+        count = 0
+        while widgets:
+            widget = widgets.pop()
+            widgets.extend(widget.winfo_children())
+            count += 1
+
+        return count
+
+    def pressure_update(self, time):
         if time != '':
             pg.StartPage.update_doors_message(self.frames[pg.StartPage], time)
-            pg.StartPage.update_start_data(self.frames[pg.StartPage])
-
-
-def call_repeatedly(interval, func, *args):
-    """ Call func(*args) every {interval} seconds. """
 
-    stopped = threading.Event()
 
-    def loop():
-        while not stopped.wait(interval):  # the first call is in `interval` secs
-            func(*args)
+def report_startup():
+    """ Print startup timings if asked for, or if the window took too long to show. """
 
-    threading.Thread(target=loop, daemon=True).start()
-    return stopped.set
+    if im.enabled or im.startup_elapsed('first paint') > constants.STARTUP_TARGET_SECS:
+        print(im.startup_report())
+        print(f"startup: first paint in {im.startup_elapsed('first paint') * 1000:.0f} ms, "
+              f"target {constants.STARTUP_TARGET_SECS * 1000:.0f} ms")
 
 
 if __name__ == '__main__':
+    im.startup_stage('imports')
     fh.folder_prep()  # prepare csv folder
-    fh.connect_to_serial()  # start serial communication if available
 
     app = SensorCentral()  # start the app
+    app.iconbitmap(st.current.icon_path)  # set app icon
+    app.update()  # show the window before readings (and pandas, matplotlib) are loaded
+    im.startup_stage('first paint')
+
+    fh.fill_buffers()  # load readings stored in csv folder to sensor buffers
+
+    # if a collector is running, follow the files it stores readings to instead of reading serial
+    if fh.collector_running():
+        fh.attached = True
+        print('Collector running, showing readings it stores.')
+    else:
+        fh.connect_to_serial()  # open serial ports and start serial communication if available
+    im.startup_stage('readings loaded')
+
+    app.draw_start_page()  # once first readings arrive, startup timings are reported then
+
+    # updates are scheduled even if device isn't connected yet, because it can be plugged in while app runs
+    app_updates = us.UpdateScheduler(app, constants.START_UPDATE_INTERVAL_SECS,
+                                     app.prepare_app_update, app.app_update)  # app update and door open checks
+    sensor_updates = us.UpdateScheduler(app, constants.SENSOR_UPDATE_INTERVAL_SECS,
+                                        app.prepare_sensor_update, app.sensor_update)  # sensor page updates
+    app_updates.start()
+    sensor_updates.start()
 
-    if fh.check_serial_connection():
-        cancel_future_calls = call_repeatedly(constants.START_UPDATE_INTERVAL_SECS,
-                                              app.app_update, )  # call for repeated app update and door open checks
-        cancel_sensor_calls = call_repeatedly(constants.SENSOR_UPDATE_INTERVAL_SECS,
-                                              app.sensor_update, )  # call for repeated sensor page updates
+    app.mainloop()  # enter main app loop after repeated calls instantiated
 
-    app.iconbitmap(constants.ICON_PATH)  # set app icon
+    fh.close_writer()  # flush pending sensor readings to csv
 
-    app.mainloop()  # enter main app loop after repeated calls instantiated
+    if im.enabled:
+        im.dump()  # keep metrics of this run
 
     sys.exit()  # exit program after window closes
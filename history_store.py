@@ -0,0 +1,152 @@
+""" History store
+
+This file contains the long-term store of sensor readings, kept in an SQLite database (HISTORY_DB).
+Raw readings are kept for HISTORY_RAW_DAYS days. As readings arrive, 1-minute, 1-hour and 1-day
+rollups (count, sum, min, max) are updated too, so trends over days, weeks or months are read from
+a rollup level with a bounded number of rows instead of scanning raw readings.
+1-minute rollups are kept for HISTORY_MINUTE_DAYS days, hourly and daily ones indefinitely.
+
+It can also be imported as a module and contains the following
+classes:
+    * HistoryStore - SQLite store of raw readings and their multi-resolution rollups
+"""
+import sqlite3
+import threading
+import time
+
+import constants
+
+# rollup levels - bucket length in seconds
+MINUTE = 60
+HOUR = 60 * 60
+DAY = 24 * 60 * 60
+LEVELS = [MINUTE, HOUR, DAY]
+
+
+class HistoryStore:
+    """
+        A class used to store sensor readings long-term and query them at a fitting resolution.
+        Readings are added in batches, flushed together with the CSV writer.
+
+        Attributes
+        ----------
+        path : str
+            Location of the SQLite database file.
+
+        Methods
+        -------
+        add(self, stream, timestamp, value)
+            Queue a reading of stream (e.g. 'TMP116/temperature') to be stored on next flush.
+
+        flush(self)
+            Store queued readings and update their rollups in a single transaction.
+
+        flush_if_due(self)
+            Flush if readings have been queued for longer than FLUSH_INTERVAL_SECS.
+
+        prune(self, now=None)
+            Delete raw readings and 1-minute rollups older than their retention periods.
+
+        query(self, stream, start, end)
+            Return list of (timestamp, min, mean, max) of stream between epoch timestamps start and end,
+            from the finest level that has at most HISTORY_MAX_POINTS points in that period.
+
+        level_for(self, start, end)
+            Return level query would read for the period - 0 for raw readings, else bucket length in seconds.
+
+        close(self)
+            Flush queued readings and close the database.
+    """
+
+    def __init__(self, path=None):
+        self.path = path if path is not None else constants.HISTORY_DB
+
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript('''
+            CREATE TABLE IF NOT EXISTS raw (stream TEXT, timestamp REAL, value REAL);
+            CREATE INDEX IF NOT EXISTS raw_stream_timestamp ON raw (stream, timestamp);
+            CREATE INDEX IF NOT EXISTS raw_timestamp ON raw (timestamp);
+            CREATE TABLE IF NOT EXISTS rollups (level INTEGER, stream TEXT, bucket INTEGER,
+                                                count INTEGER, total REAL, minimum REAL, maximum REAL,
+                                                PRIMARY KEY (level, stream, bucket));
+        ''')
+
+    def add(self, stream, timestamp, value):
+        with self._lock:
+            self._pending.append((stream, timestamp, value))
+
+    def flush_if_due(self):
+        if self._pending and time.monotonic() - self._last_flush >= constants.FLUSH_INTERVAL_SECS:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            if not pending:
+                return
+
+            rollups = [(level, stream, int(timestamp // level) * level, value, value, value)
+                       for stream, timestamp, value in pending for level in LEVELS]
+
+            with self._connection:
+                self._connection.executemany('INSERT INTO raw VALUES (?, ?, ?)', pending)
+                self._connection.executemany('''
+                    INSERT INTO rollups VALUES (?, ?, ?, 1, ?, ?, ?)
+                    ON CONFLICT (level, stream, bucket) DO UPDATE SET
+                        count = count + 1,
+                        total = total + excluded.total,
+                        minimum = min(minimum, excluded.minimum),
+                        maximum = max(maximum, excluded.maximum)
+                ''', rollups)
+
+    def prune(self, now=None):
+        if now is None:
+            now = time.time()
+
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM raw WHERE timestamp < ?',
+                                     (now - constants.HISTORY_RAW_DAYS * DAY,))
+            self._connection.execute('DELETE FROM rollups WHERE level = ? AND bucket < ?',
+                                     (MINUTE, now - constants.HISTORY_MINUTE_DAYS * DAY))
+
+    def level_for(self, start, end):
+        span = end - start
+        now = time.time()
+        if span <= constants.HISTORY_RAW_SPAN_SECS and start >= now - constants.HISTORY_RAW_DAYS * DAY:
+            return 0
+
+        for level in LEVELS:
+            # minute rollups older than their retention were pruned
+            if level == MINUTE and start < now - constants.HISTORY_MINUTE_DAYS * DAY:
+                continue
+            if span / level <= constants.HISTORY_MAX_POINTS:
+                return level
+
+        return DAY
+
+    def query(self, stream, start, end):
+        level = self.level_for(start, end)
+
+        with self._lock:
+            if level == 0:
+                rows = self._connection.execute('''
+                    SELECT timestamp, value, value, value FROM raw
+                    WHERE stream = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp
+                ''', (stream, start, end)).fetchall()
+            else:
+                rows = self._connection.execute('''
+                    SELECT bucket, minimum, total / count, maximum FROM rollups
+                    WHERE level = ? AND stream = ? AND bucket BETWEEN ? AND ? ORDER BY bucket
+                ''', (level, stream, int(start // level) * level, end)).fetchall()
+
+        return rows
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._connection.close()
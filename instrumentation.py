@@ -0,0 +1,212 @@
+""" Instrumentation
+
+This file contains the timers used to find out where the app spends its time when it lags.
+Timed functions (serial reading, CSV parsing and trimming, door/window detection, plotting, page updates)
+record their duration, and page updates record the lag from arrival of the newest reading they show
+to the moment it is on screen. The last METRICS_SAMPLES samples of each metric are kept, so p50/p95/p99
+reflect recent behaviour.
+
+Instrumentation is enabled by INSTRUMENTATION, or at runtime from the diagnostics page. While disabled,
+a timed function only checks one flag before calling through.
+
+Startup is timed in stages, from launch (import of this module, the first one the app imports) to the window's
+first paint and on to graphs being drawn, and reported in the style of python -X importtime.
+First paint is expected within STARTUP_TARGET_SECS.
+
+It can also be imported as a module and contains the following
+classes and methods:
+    * Metric - window of recent samples of a duration or lag, with count, mean and percentiles
+    * timed - decorator recording duration of each call of a function under a name
+    * record - records a sample of a metric
+    * record_lag - records lag from arrival of a reading to its display
+    * summary - returns statistics of all metrics
+    * report - returns statistics of all metrics as a text table
+    * dump - writes statistics of all metrics to a JSON file
+    * startup_stage - records that a startup stage finished
+    * startup_elapsed - returns seconds from launch to the end of a startup stage
+    * startup_report - returns durations of startup stages as a text table
+"""
+import functools
+import json
+import math
+import threading
+import time
+from collections import deque
+
+import constants
+
+enabled = constants.INSTRUMENTATION
+metrics = {}  # name : Metric
+_lock = threading.Lock()
+_shown = {}  # lag metric name : timestamp of the newest reading it recorded
+startup_stages = [('launch', time.perf_counter())]  # (stage name, perf_counter time it finished at)
+
+
+class Metric:
+    """
+        A class used to keep recent samples of a metric, in seconds.
+
+        Attributes
+        ----------
+        count : int
+            Number of samples recorded since the app started.
+
+        total : float
+            Sum of samples recorded since the app started.
+
+        Methods
+        -------
+        add(self, value)
+            Record a sample.
+
+        percentile(self, p)
+            Return p-th percentile (0-100) of recent samples, None if there are none.
+
+        summary(self)
+            Return dict of count, mean, p50, p95, p99 and max of recent samples.
+    """
+
+    def __init__(self, size=None):
+        self.count = 0
+        self.total = 0.0
+
+        self._samples = deque(maxlen=size if size is not None else constants.METRICS_SAMPLES)
+        self._lock = threading.Lock()
+
+    def add(self, value):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self._samples.append(value)
+
+    def percentile(self, p):
+        with self._lock:
+            samples = sorted(self._samples)
+
+        return _nearest_rank(samples, p)
+
+    def summary(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total = self.count, self.total
+
+        return {'count': count, 'mean': total / count if count else None,
+                'p50': _nearest_rank(samples, 50), 'p95': _nearest_rank(samples, 95),
+                'p99': _nearest_rank(samples, 99), 'max': samples[-1] if samples else None}
+
+
+def _nearest_rank(samples, p):
+    if not samples:
+        return None
+    return samples[max(math.ceil(p / 100 * len(samples)) - 1, 0)]
+
+
+def _metric(name):
+    metric = metrics.get(name)
+    if metric is None:
+        with _lock:
+            metric = metrics.setdefault(name, Metric())
+    return metric
+
+
+def record(name, seconds):
+    """ Record a sample of metric name, if instrumentation is enabled. """
+
+    if enabled:
+        _metric(name).add(seconds)
+
+
+def record_lag(name, timestamp):
+    """ Record lag from arrival of the newest shown reading to now, once per reading.
+
+        Arguments:
+            name - name of the lag metric, e.g. 'lag/start_page'
+            timestamp - epoch time the newest shown reading arrived at, None if nothing is shown
+    """
+
+    if not enabled or timestamp is None or timestamp <= _shown.get(name, 0):
+        return
+
+    _shown[name] = timestamp
+    _metric(name).add(time.time() - timestamp)
+
+
+def timed(name):
+    """ Return decorator recording duration of each call of the decorated function as metric name. """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _metric(name).add(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def summary():
+    """ Return {metric name : statistics} of all metrics, statistics in seconds. """
+
+    with _lock:
+        items = sorted(metrics.items())
+
+    return {name: metric.summary() for name, metric in items}
+
+
+def report():
+    """ Return statistics of all metrics as a text table, in milliseconds. """
+
+    lines = [f'{"":28}{"count":>8}{"p50":>10}{"p95":>10}{"p99":>10}{"max":>10}']
+    for name, stats in summary().items():
+        values = ''.join(f'{stats[key] * 1000:10.1f}' for key in ['p50', 'p95', 'p99', 'max'])
+        lines.append(f'{name:28}{stats["count"]:8}{values}')
+
+    return '\n'.join(lines)
+
+
+def dump(path=None):
+    """ Write statistics of all metrics to a JSON file; default METRICS_FILE. Returns the file's path. """
+
+    if path is None:
+        path = constants.METRICS_FILE
+
+    with open(path, 'w') as file:
+        json.dump({'time': time.time(), 'metrics': summary()}, file, indent=2)
+
+    return path
+
+
+def startup_stage(name):
+    """ Record that startup stage name finished now. If instrumentation is enabled, seconds since launch are
+        also recorded as metric 'startup/<name>'.
+    """
+
+    startup_stages.append((name, time.perf_counter()))
+    record(f'startup/{name}', startup_elapsed(name))
+
+
+def startup_elapsed(name):
+    """ Return seconds from launch to the end of startup stage name, None if it hasn't finished. """
+
+    finished = dict(startup_stages).get(name)
+    return finished - startup_stages[0][1] if finished is not None else None
+
+
+def startup_report():
+    """ Return startup stages as a text table in the style of python -X importtime: ms each stage took,
+        and ms since launch.
+    """
+
+    lines = ['startup: self [ms] | cumulative [ms] | stage']
+    for (_, previous), (name, finished) in zip(startup_stages, startup_stages[1:]):
+        lines.append(f'startup: {(finished - previous) * 1000:9.0f} | '
+                     f'{(finished - startup_stages[0][1]) * 1000:15.0f} | {name}')
+
+    return '\n'.join(lines)
@@ -7,18 +7,22 @@ import tkinter as tk
 from tkinter import messagebox
 from tkinter import LEFT
 
-import matplotlib
-import pandas as pd
 import numpy as np
 import re
+from datetime import datetime
 
 import constants
 from constants import *
 import element_constructor as ec
 import file_handler as fh
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import instrumentation as im
+import sensor_buffer as sb
+import settings as st
 
-matplotlib.use("TkAgg")
+
+def format_time(timestamp):
+    """ Format epoch timestamp of a reading the way it is stored in CSV files. """
+    return datetime.fromtimestamp(timestamp).strftime('%d/%m/%Y %H:%M:%S')
 
 
 def validate_entries(values):
@@ -35,13 +39,15 @@ def validate_entries(values):
                 and float(values['HUM_MIN']) and float(values['HUM_MAX'])
                 and float(values['LUX_MIN']) and float(values['LUX_MAX'])
                 and float(values['PRES_MIN']) and float(values['PRES_MAX'])
+                and float(values['PRESSURE_DIFF_PA'])
                 and re.match("COM[0-9][0-9]?$", values['SERIAL_PORT'])):
 
             # check numeric value ranges (min < max)
             if (float(values['TEMP_MIN']) < float(values['TEMP_MAX'])
                     and float(values['HUM_MIN']) < float(values['HUM_MAX'])
                     and float(values['LUX_MIN']) < float(values['LUX_MAX'])
-                    and float(values['PRES_MIN']) < float(values['PRES_MAX'])):
+                    and float(values['PRES_MIN']) < float(values['PRES_MAX'])
+                    and float(values['PRESSURE_DIFF_PA']) > 0):
                 return True
             else:
                 messagebox.showerror('Neispravan raspon!', 'Molimo, pokušajte ponovo.')
@@ -56,7 +62,7 @@ def validate_entries(values):
 
 class UpdatePage(tk.Frame):
     """
-        A class for a page used to update MIN, MAX values and serial port.
+        A class for a page used to update MIN, MAX values, door/window opening threshold and serial port.
         This is achieved by fetching new data from the GUI, and calling file_handler.py
         method write_to_config(values) to change the config.ini file.
 
@@ -65,6 +71,9 @@ class UpdatePage(tk.Frame):
         temp_min, temp_max, hum_min, ... : tk.StringVar
             Variables that hold the string values of min/max values of different types of sensor readings.
 
+        pressure_diff : tk.StringVar
+            Holds the string value of pressure difference [Pa] counted as a door/window opening.
+
         serial_port : tk.StringVar
             Holds the string value of the port your Arduino device should be connected to.
 
@@ -103,6 +112,7 @@ class UpdatePage(tk.Frame):
     def update_data(self, controller):
         self.update_config()
         controller.app_update()
+        controller.sensor_update()  # sensor pages show new thresholds when opened
 
     def update_config(self):
         values = {'TEMP_MIN': self.temp_min.get(),
@@ -113,6 +123,7 @@ class UpdatePage(tk.Frame):
                   'LUX_MAX': self.light_max.get(),
                   'PRES_MIN': self.pres_min.get(),
                   'PRES_MAX': self.pres_max.get(),
+                  'PRESSURE_DIFF_PA': self.pressure_diff.get(),
                   'SERIAL_PORT': self.serial_port.get()}
 
         if validate_entries(values):
@@ -146,6 +157,9 @@ class UpdatePage(tk.Frame):
         label_pres_max = tk.Label(self, text='Maksimalni atmosferski tlak [Pa]: ')
         label_pres_max.place(x=100, y=375)
 
+        label_pressure_diff = tk.Label(self, text='Prag otvaranja vrata/prozora [Pa]: ')
+        label_pressure_diff.place(x=100, y=400)
+
         label_serial = tk.Label(self, text='Serial port: ')
         label_serial.place(x=100, y=425)
 
@@ -181,6 +195,9 @@ class UpdatePage(tk.Frame):
         entry_pres_max = tk.Entry(self, textvariable=self.pres_max)
         entry_pres_max.place(x=375, y=375)
 
+        entry_pressure_diff = tk.Entry(self, textvariable=self.pressure_diff)
+        entry_pressure_diff.place(x=375, y=400)
+
         entry_serial = tk.Entry(self, textvariable=self.serial_port)
         entry_serial.place(x=375, y=425)
 
@@ -189,15 +206,17 @@ class UpdatePage(tk.Frame):
         self.init_labels('Ažuriranje vrijednosti')
         self.init_buttons(controller)
 
-        self.temp_min = tk.StringVar(value=TEMP_MIN)
-        self.temp_max = tk.StringVar(value=TEMP_MAX)
-        self.hum_min = tk.StringVar(value=HUM_MIN)
-        self.hum_max = tk.StringVar(value=HUM_MAX)
-        self.light_min = tk.StringVar(value=LUX_MIN)
-        self.light_max = tk.StringVar(value=LUX_MAX)
-        self.pres_min = tk.StringVar(value=PRES_MIN)
-        self.pres_max = tk.StringVar(value=PRES_MAX)
-        self.serial_port = tk.StringVar(value=SERIAL_PORT)
+        settings = st.current
+        self.temp_min = tk.StringVar(value=settings.temp_min)
+        self.temp_max = tk.StringVar(value=settings.temp_max)
+        self.hum_min = tk.StringVar(value=settings.hum_min)
+        self.hum_max = tk.StringVar(value=settings.hum_max)
+        self.light_min = tk.StringVar(value=settings.lux_min)
+        self.light_max = tk.StringVar(value=settings.lux_max)
+        self.pres_min = tk.StringVar(value=settings.pres_min)
+        self.pres_max = tk.StringVar(value=settings.pres_max)
+        self.pressure_diff = tk.StringVar(value=settings.pressure_diff_pa)
+        self.serial_port = tk.StringVar(value=settings.serial_port)
 
         self.init_entries()
 
@@ -210,15 +229,18 @@ class SensorPage(tk.Frame):
         Attributes
         ----------
         average_message : tk.StringVar
-            Variable message about the average value in matching sensor reading buffer.
+            Variable message about the average and extreme values in matching sensor reading buffer.
 
         current_message : tk.StringVar
             Variable message about the latest value in matching sensor reading buffer.
 
+        period_message : tk.StringVar
+            Variable message about the period of readings in sensor reading buffer.
+
         graphs : tk.Figure
             Each sensor page contains 1 or 2 graphs for its readings.
-            Graph data is stored in csv as a circular buffer.
-            Graph figures are drawn using FigureCanvasTkAgg.
+            Graph data is stored in sensor buffers (sensor_buffer.py) and persisted to csv.
+            Graph figures are made once and drawn using FigureCanvasTkAgg (see ec.Plot).
 
         average values : tk.Label
             Label(s) containing average_message(s).
@@ -226,6 +248,9 @@ class SensorPage(tk.Frame):
         current values : tk.Label
             Label(s) containing current_message(s).
 
+        period : tk.Label
+            Label containing period_message.
+
         Methods
         -------
         init_label(self, sensor_label)
@@ -234,12 +259,67 @@ class SensorPage(tk.Frame):
         init_buttons(self, controller)
             Makes and places buttons ("Return" button).
 
+        init_plots(self, files, measures, titles, color)
+            Makes and places graphs for all sensor readings, once per page.
+
+        init_value_labels(self, file_count)
+            Makes and places average, current value and period labels, once per page.
+
+        collect_data(self, files, values, measures)
+            Returns graph data and average, current value and period messages. Can be called from worker threads.
+
         update_data(self, files, values, measures, titles, color)
-            Makes and places graphs and average and current values on the page for all sensor readings.
+            Updates graphs, and average and current value messages on the page for all sensor readings.
             Allows values to be updated interactively by clicking update button.
     """
 
-    def update_data(self, files, values, measures, titles, color=-1):
+    def collect_data(self, files, values, measures):
+        """Returns graph data and messages for update_data.
+            Doesn't touch any widgets, so it can be called from worker threads.
+            Messages that can't be calculated (no readings in buffer) are None.
+
+            Parameters are the same as in update_data.
+        """
+
+        data = {'plots': [plot.prepare() for plot in self.plots],
+                'average': [], 'current': [], 'period': None}
+
+        file_num = 0
+        for file in files:
+            # Take average and extreme values from buffer's running statistics
+            buffer = sb.shown_buffer(file)
+            try:
+                average = str(round(buffer.mean(), 4))
+                minimum = str(round(buffer.minimum(), 4))
+                maximum = str(round(buffer.maximum(), 4))
+                data['average'].append('Prosječna vrijednost '
+                                       + values[file_num] + ': '
+                                       + average + measures[file_num]
+                                       + ' (min: ' + minimum + measures[file_num]
+                                       + ', maks: ' + maximum + measures[file_num] + ')')
+            except IndexError:
+                data['average'].append(None)
+
+            # Use last value from buffer as current value
+            try:
+                value = buffer.latest()
+                data['current'].append(ec.construct_labels(measure=values[file_num], value=value))
+            except IndexError:
+                data['current'].append(None)
+
+            file_num += 1
+
+        # Calculate period
+        try:
+            period_start = format_time(sb.shown_buffer(files[0]).first_time())
+            period_end = format_time(sb.shown_buffer(files[0]).last_time())
+            data['period'] = f'Period: {period_start} do {period_end}'
+        except IndexError:
+            pass
+
+        return data
+
+    def update_data(self, files, values, measures, titles, color=-1, data=None):
         """Updates graphs and labels on page
 
             Parameters
@@ -260,51 +340,53 @@ class SensorPage(tk.Frame):
 
             :param color: int
                 index of graph color
+
+            :param data: dict
+                data returned by collect_data; collected on the spot if not passed
         """
 
-        file_num = 0
-        for file in files:
-            figure = ec.make_plots([file], (6, 5), titles[file_num], measures[file_num], color)
-            canvas = FigureCanvasTkAgg(figure, self)
-            canvas.draw()
-            canvas.get_tk_widget().place(x=constants.graph_coords[file_num][0],
-                                         y=constants.graph_coords[file_num][1])
-
-            # Calculate average value from file and place label accordingly.
-            data = pd.read_csv(file, names=headers)
-            average = str(round(data['Vrijednost'].mean(), 4))
-            self.average_message[file_num].set('Prosječna vrijednost '
-                                               + values[file_num] + ': '
-                                               + average + measures[file_num])
+        if data is None:
+            data = SensorPage.collect_data(self, files, values, measures)
+
+        for file_num in range(len(files)):
+            self.plots[file_num].update(data['plots'][file_num])
+
+            if data['average'][file_num] is not None:
+                self.average_message[file_num].set(data['average'][file_num])
+            if data['current'][file_num] is not None:
+                self.current_message[file_num].set(data['current'][file_num])
+
+        if data['period'] is not None:
+            self.period_message.set(data['period'])
+
+    def init_plots(self, files, measures, titles, color=-1):
+        """Makes and places a graph for each file, to be updated by update_data"""
+
+        self.plots = []
+        for file_num, file in enumerate(files):
+            plot = ec.Plot(self, [file], (6, 5), titles[file_num], measures[file_num], color)
+            plot.widget.place(x=constants.graph_coords[file_num][0],
+                              y=constants.graph_coords[file_num][1])
+            self.plots.append(plot)
+
+    def init_value_labels(self, file_count):
+        """Makes and places average, current value and period labels, to be updated through their variables"""
+
+        for file_num in range(file_count):
             avg_label = tk.Label(self,
                                  textvariable=self.average_message[file_num],
                                  font=MID_FONT)
             avg_label.place(x=text_coords[file_num][0], y=text_coords[file_num][1])
 
-            # Use last value from file as current value and place label accordingly
-            try:
-                value = data.iloc[-1]['Vrijednost']
-                self.current_message[file_num].set(ec.construct_labels(
-                    measure=values[file_num], value=value))
-                indicator_label = tk.Label(self,
-                                           textvariable=self.current_message[file_num],
-                                           font=MID_FONT)
-                indicator_label.place(x=current_coords[file_num][0], y=current_coords[file_num][1])
-            except IndexError:
-                pass
-
-            # Calculate and place period label
-            try:
-                period_start = pd.read_csv(files[0], names=headers)['Vrijeme'].iloc[0]
-                period_end = pd.read_csv(files[0], names=headers)['Vrijeme'].iloc[-1]
-                period_label = tk.Label(self, text=f'Period: {period_start} do {period_end}',
-                                        anchor="w", justify=LEFT, font=MID_FONT)
-                period_label.place(x=period_sensorpage_coords['x'],
-                                   y=period_sensorpage_coords['y'])
-            except IndexError:
-                pass
+            indicator_label = tk.Label(self,
+                                       textvariable=self.current_message[file_num],
+                                       font=MID_FONT)
+            indicator_label.place(x=current_coords[file_num][0], y=current_coords[file_num][1])
 
-            file_num += 1
+        period_label = tk.Label(self, textvariable=self.period_message,
+                                anchor="w", justify=LEFT, font=MID_FONT)
+        period_label.place(x=period_sensorpage_coords['x'],
+                           y=period_sensorpage_coords['y'])
 
     def init_label(self, sensor_label):
         label = tk.Label(self, text=sensor_label, font=LARGE_FONT)
@@ -319,6 +401,7 @@ class SensorPage(tk.Frame):
 
         self.average_message = [tk.StringVar(), tk.StringVar()]
         self.current_message = [tk.StringVar(), tk.StringVar()]
+        self.period_message = tk.StringVar()
 
 
 class TMP116Page(SensorPage):
@@ -328,9 +411,12 @@ class TMP116Page(SensorPage):
 
         self.average_message = [tk.StringVar(), tk.StringVar()]
         self.current_message = [tk.StringVar(), tk.StringVar()]
+        self.period_message = tk.StringVar()
 
         TMP116Page.init_label(self, "TMP116")
         TMP116Page.init_buttons(self, controller)
+        TMP116Page.init_plots(self, [tmp116_csv], [temp_measurement], [temp_name])
+        TMP116Page.init_value_labels(self, 1)
         TMP116Page.update_data(self, [tmp116_csv], [temp_string], [temp_measurement], [temp_name])
 
         # a button to update TMP116 page
@@ -347,9 +433,13 @@ class HDC2010Page(SensorPage):
 
         self.average_message = [tk.StringVar(), tk.StringVar()]
         self.current_message = [tk.StringVar(), tk.StringVar()]
+        self.period_message = tk.StringVar()
 
         HDC2010Page.init_label(self, "HDC2010")
         HDC2010Page.init_buttons(self, controller)
+        HDC2010Page.init_plots(self, [hdc2010_temp_csv, hdc2010_hum_csv],
+                               [temp_measurement, hum_measurement], [temp_name, hum_name], 3)
+        HDC2010Page.init_value_labels(self, 2)
         HDC2010Page.update_data(self, [hdc2010_temp_csv, hdc2010_hum_csv],
                                 [temp_string, hum_string],
                                 [temp_measurement, hum_measurement],
@@ -371,9 +461,12 @@ class OPT3001Page(SensorPage):
 
         self.average_message = [tk.StringVar(), tk.StringVar()]
         self.current_message = [tk.StringVar(), tk.StringVar()]
+        self.period_message = tk.StringVar()
 
         OPT3001Page.init_label(self, "OPT3001")
         OPT3001Page.init_buttons(self, controller)
+        OPT3001Page.init_plots(self, [opt3001_csv], [light_measurement], [light_name], 4)
+        OPT3001Page.init_value_labels(self, 1)
         OPT3001Page.update_data(self, [opt3001_csv], [light_string], [light_measurement], [light_name], 4)
 
         # a button to update OPT3001 page
@@ -389,9 +482,13 @@ class DPS310Page(SensorPage):
 
         self.average_message = [tk.StringVar(), tk.StringVar()]
         self.current_message = [tk.StringVar(), tk.StringVar()]
+        self.period_message = tk.StringVar()
 
         DPS310Page.init_label(self, "DPS301")
         DPS310Page.init_buttons(self, controller)
+        DPS310Page.init_plots(self, [dps310_temp_csv, dps310_pressure_csv],
+                              [temp_measurement, pressure_measurement], [temp_name, pressure_name], 5)
+        DPS310Page.init_value_labels(self, 2)
         DPS310Page.update_data(self, [dps310_temp_csv, dps310_pressure_csv],
                                [temp_string, pressure_string], [temp_measurement, pressure_measurement],
                                [temp_name, pressure_name], 5)
@@ -423,6 +520,9 @@ class StartPage(tk.Frame):
         doors_message : tk.StringVar
             Variable message saying when doors and windows were last opened
 
+        period_message : tk.StringVar
+            Variable message about the period of readings shown on graphs
+
         current values : tk.Label
             Contains latest measure values and appropriate messages.
             Messages also contain tips (telling the user to heat the room, let light in, etc.).
@@ -434,86 +534,105 @@ class StartPage(tk.Frame):
 
         Methods
         -------
-        update_start_data(self)
-            Makes and places graphs and current values on the page for all sensors' readings.
+        init_plots(self)
+            Makes and places graphs for all sensors' readings, once per page. Called once the window is shown.
+
+        collect_start_data(self)
+            Returns graph data and current value and period messages. Can be called from worker threads.
+
+        update_start_data(self, data=None)
+            Updates graphs, and current value and period messages on the page for all sensors' readings.
             Allows values to be updated interactively by clicking update button.
 
         update_doors_message(self, time)
             When doors or window opening has been detected, update that label
+
+        select_device(self, controller, name)
+            Show readings of device name on all pages. Only offered if more than one device is configured.
     """
 
-    def update_start_data(self):
-        # temperature graph (3 sensors' values)
-        figure = ec.make_plots([tmp116_csv, hdc2010_temp_csv, dps310_temp_csv], (5, 3), 'Temperatura', '°C')
-        canvas = FigureCanvasTkAgg(figure, self)
-        canvas.draw()
-        canvas.get_tk_widget().place(x=50, y=160)
-
-        # humidity graph
-        figure = ec.make_plots([hdc2010_hum_csv], (5, 3), 'Vlažnost zraka', '%', 3)
-        canvas = FigureCanvasTkAgg(figure, self)
-        canvas.draw()
-        canvas.get_tk_widget().place(x=600, y=160)
-
-        # light levels graph
-        figure = ec.make_plots([opt3001_csv], (5, 3), 'Svjetlina', 'lux', 4)
-        canvas = FigureCanvasTkAgg(figure, self)
-        canvas.draw()
-        canvas.get_tk_widget().place(x=50, y=480)
-
-        # atmospheric pressure graph
-        figure = ec.make_plots([dps310_pressure_csv], (5, 3), 'Atmosferski tlak', 'Pa', 5)
-        canvas = FigureCanvasTkAgg(figure, self)
-        canvas.draw()
-        canvas.get_tk_widget().place(x=600, y=480)
-
-        # current values calculation and label
+    # graphs on the page - files, title, unit, colour index (-1 for r-g-b-...), position
+    plot_specs = [([tmp116_csv, hdc2010_temp_csv, dps310_temp_csv], 'Temperatura', '°C', -1, (50, 160)),  # 3 sensors
+                  ([hdc2010_hum_csv], 'Vlažnost zraka', '%', 3, (600, 160)),
+                  ([opt3001_csv], 'Svjetlina', 'lux', 4, (50, 480)),
+                  ([dps310_pressure_csv], 'Atmosferski tlak', 'Pa', 5, (600, 480))]
+
+    def collect_start_data(self):
+        """ Returns graph data and messages for update_start_data.
+            Doesn't touch any widgets, so it can be called from worker threads.
+        """
+
+        data = {'plots': [plot.prepare() for plot in self.plots], 'period': None}
+
+        # current values calculation
         try:
-            temp_value = round(np.average([pd.read_csv(tmp116_csv, names=headers)['Vrijednost'].iloc[-1],
-                                           pd.read_csv(hdc2010_temp_csv, names=headers)['Vrijednost'].iloc[-1],
-                                           pd.read_csv(dps310_temp_csv, names=headers)['Vrijednost'].iloc[-1]]), 4)
+            temp_value = round(np.average([sb.shown_buffer(tmp116_csv).latest(),
+                                           sb.shown_buffer(hdc2010_temp_csv).latest(),
+                                           sb.shown_buffer(dps310_temp_csv).latest()]), 4)
         except IndexError:
             temp_value = None
 
         try:
-            hum_value = pd.read_csv(hdc2010_hum_csv, names=headers)['Vrijednost'].iloc[-1]
+            hum_value = sb.shown_buffer(hdc2010_hum_csv).latest()
         except IndexError:
             hum_value = None
 
         try:
-            light_value = pd.read_csv(opt3001_csv, names=headers)['Vrijednost'].iloc[-1]
+            light_value = sb.shown_buffer(opt3001_csv).latest()
         except IndexError:
             light_value = None
 
         try:
-            pressure_value = pd.read_csv(dps310_pressure_csv, names=headers)['Vrijednost'].iloc[-1]
+            pressure_value = sb.shown_buffer(dps310_pressure_csv).latest()
         except IndexError:
             pressure_value = None
 
-        self.indicator_message.set(ec.construct_labels(temp=temp_value, humidity=hum_value, light=light_value,
-                                                       pressure=pressure_value, tips_wanted=True))
-        indicator_label = tk.Label(self, textvariable=self.indicator_message, font=MID_FONT_SMALLER, justify=LEFT)
-        indicator_label.place(x=start_text_coords['x'],
-                              y=start_text_coords['y'])
+        data['indicator'] = ec.construct_labels(temp=temp_value, humidity=hum_value, light=light_value,
+                                                pressure=pressure_value, tips_wanted=True)
 
-        # measuring period calculation and label
+        # measuring period calculation
         try:
-            period_start = pd.read_csv(opt3001_csv, names=headers)['Vrijeme'].iloc[0]
-            period_end = pd.read_csv(opt3001_csv, names=headers)['Vrijeme'].iloc[-1]
-            period_label = tk.Label(self, text=f'Period :  {period_start}\ndo {period_end}',
-                                    anchor="w", justify=LEFT, font=MID_FONT)
-            period_label.place(x=period_coords['x'], y=period_coords['y'])
+            period_start = format_time(sb.shown_buffer(opt3001_csv).first_time())
+            period_end = format_time(sb.shown_buffer(opt3001_csv).last_time())
+            data['period'] = f'Period :  {period_start}\ndo {period_end}'
         except IndexError:
-            return
+            pass
+
+        return data
+
+    def update_start_data(self, data=None):
+        if data is None:
+            data = StartPage.collect_start_data(self)
+
+        for plot, plot_data in zip(self.plots, data['plots']):
+            plot.update(plot_data)
+
+        self.indicator_message.set(data['indicator'])
+        if data['period'] is not None:
+            self.period_message.set(data['period'])
+
+    def init_plots(self):
+        self.plots = []
+        for files, title, unit, color, (x, y) in StartPage.plot_specs:
+            plot = ec.Plot(self, files, (5, 3), title, unit, color)
+            plot.widget.place(x=x, y=y)
+            self.plots.append(plot)
 
     def update_doors_message(self, time):
         self.doors_message.set(door_open_msg + time)
 
+    def select_device(self, controller, name):
+        sb.selected = name
+        fh.fill_buffers([name])  # catch up with readings stored while another device was shown
+        controller.app_update()
+        controller.sensor_update()
+
     def __init__(self, parent, controller):
         tk.Frame.__init__(self, parent)
 
         self.indicator_message = tk.StringVar()
         self.doors_message = tk.StringVar()
+        self.period_message = tk.StringVar()
 
         label = tk.Label(self, text=START_NAME, font=LARGE_FONT)
         label.place(relx=0.4, y=25)
@@ -524,7 +643,13 @@ class StartPage(tk.Frame):
         label_doors = tk.Label(self, textvariable=self.doors_message, font=MID_FONT)
         label_doors.place(x=doors_message_coords['x'], y=doors_message_coords['y'])
 
-        StartPage.update_start_data(self)
+        indicator_label = tk.Label(self, textvariable=self.indicator_message, font=MID_FONT_SMALLER, justify=LEFT)
+        indicator_label.place(x=start_text_coords['x'], y=start_text_coords['y'])
+
+        period_label = tk.Label(self, textvariable=self.period_message, anchor="w", justify=LEFT, font=MID_FONT)
+        period_label.place(x=period_coords['x'], y=period_coords['y'])
+
+        self.plots = []  # made by init_plots once the window is shown (see gui.py)
 
         button_tmp = tk.Button(self, text="TMP116 očitanja", command=lambda: controller.show_frame(TMP116Page))
         button_tmp.place(x=480, y=100)
@@ -542,5 +667,82 @@ class StartPage(tk.Frame):
                                       command=lambda: controller.show_frame(UpdatePage))
         button_updatepage.place(x=1125, y=100)
 
+        button_diagnostics = tk.Button(self, text="Dijagnostika",
+                                       command=lambda: controller.show_frame(DiagnosticsPage))
+        button_diagnostics.place(x=1300, y=100)
+
         button_update = tk.Button(self, text="Ažuriraj", command=lambda: StartPage.update_start_data(self))
         button_update.place(x=50, y=100)
+
+        # device (room) selection, if there are more
+        if len(devices) > 1:
+            self.device = tk.StringVar(value=sb.selected)
+            device_menu = tk.OptionMenu(self, self.device, *devices,
+                                        command=lambda name: StartPage.select_device(self, controller, name))
+            device_menu.place(x=1125, y=140)
+
+
+class DiagnosticsPage(tk.Frame):
+    """
+        A class for a page showing where the app spends its time (see instrumentation.py).
+
+        Attributes
+        ----------
+        enabled : tk.BooleanVar
+            Whether instrumentation is enabled. Toggled by a checkbox on the page.
+
+        report_message : tk.StringVar
+            Table of durations and lags of instrumented stages - count, p50, p95, p99 and max in ms.
+
+        Methods
+        -------
+        update_data(self)
+            Updates the table. Called on every app update while instrumentation is enabled.
+
+        toggle(self)
+            Enables or disables instrumentation as set by the checkbox.
+
+        dump(self)
+            Writes metrics to METRICS_FILE and shows where.
+    """
+
+    def update_data(self):
+        self.report_message.set(im.report())
+
+    def toggle(self):
+        im.enabled = self.enabled.get()
+        self.update_data()
+
+    def dump(self):
+        try:
+            path = im.dump()
+        except OSError as error:
+            messagebox.showerror('Spremanje nije uspjelo!', str(error))
+        else:
+            messagebox.showinfo('Spremljeno', f'Mjerenja su spremljena u {path}')
+
+    def __init__(self, parent, controller):
+        tk.Frame.__init__(self, parent)
+
+        self.enabled = tk.BooleanVar(value=im.enabled)
+        self.report_message = tk.StringVar()
+
+        label = tk.Label(self, text=DIAGNOSTICS_NAME, font=LARGE_FONT)
+        label.pack(pady=40, padx=10)
+
+        button_back = tk.Button(self, text="Nazad", command=lambda: controller.show_frame(StartPage))
+        button_back.place(x=button_back_coords['x'], y=button_back_coords['y'])
+
+        button_update = tk.Button(self, text="Ažuriraj", command=self.update_data)
+        button_update.place(x=button_update_coords['x'], y=button_update_coords['y'])
+
+        button_dump = tk.Button(self, text="Spremi u datoteku", command=self.dump)
+        button_dump.place(x=250, y=70)
+
+        checkbox = tk.Checkbutton(self, text='Mjerenje uključeno', variable=self.enabled, command=self.toggle)
+        checkbox.place(x=400, y=70)
+
+        report_label = tk.Label(self, textvariable=self.report_message, font=("Courier", 11), justify=LEFT)
+        report_label.place(x=100, y=150)
+
+        self.update_data()
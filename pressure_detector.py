@@ -0,0 +1,102 @@
+""" Pressure detector
+
+This file contains the detector of significant pressure differences that could mean door/window opening.
+Pressure readings are passed to the detector as they arrive from serial. It keeps minimum and maximum
+pressure of the last PRESSURE_INTERVAL_SECS seconds in monotonic deques, so every reading is handled
+in amortised O(1) time, and reports an opening as soon as their difference exceeds the pressure_diff_pa
+setting (PRESSURE_DIFF_PA unless set in config.ini). An opening is reported once, at the reading that crossed the
+threshold; the next one can be reported once the difference falls back to the threshold.
+
+It can also be imported as a module and contains the following
+classes:
+    * PressureDetector - streaming sliding-window min/max detector of door/window openings
+"""
+import threading
+from collections import deque
+
+import constants
+import settings as st
+
+
+class PressureDetector:
+    """
+        A class used to detect door/window openings from a stream of pressure readings.
+
+        Attributes
+        ----------
+        interval : float
+            Length of the sliding window in seconds.
+
+        threshold : float
+            Pressure difference in Pa within the window that counts as an opening.
+
+        last_event : float
+            Epoch timestamp of the latest detected opening, None if there was none.
+
+        Methods
+        -------
+        add(self, timestamp, value)
+            Add a pressure reading. Returns opening timestamp if the reading makes a new one detected, None otherwise.
+
+        take_event(self)
+            Return timestamp of an opening detected since the previous call, None if there was none.
+
+        add_callback(self, callback)
+            Register callback(timestamp) to be called on every detected opening.
+    """
+
+    def __init__(self, interval=None, threshold=None):
+        self.interval = interval if interval is not None else constants.PRESSURE_INTERVAL_SECS
+        self.threshold = threshold if threshold is not None else st.current.pressure_diff_pa
+        self.last_event = None
+
+        self._max = deque()  # (timestamp, value) readings with decreasing values
+        self._min = deque()  # (timestamp, value) readings with increasing values
+        self._pending = None
+        self._armed = True  # False while the difference stays above threshold after an opening was reported
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def add(self, timestamp, value):
+        with self._lock:
+            # drop readings that can't be window's max/min anymore
+            # the earliest of equal values is kept, it's the moment the change began
+            while self._max and self._max[-1][1] < value:
+                self._max.pop()
+            while self._min and self._min[-1][1] > value:
+                self._min.pop()
+            self._max.append((timestamp, value))
+            self._min.append((timestamp, value))
+
+            # drop readings older than window length
+            limit = timestamp - self.interval
+            while self._max[0][0] <= limit:
+                self._max.popleft()
+            while self._min[0][0] <= limit:
+                self._min.popleft()
+
+            if self._max[0][1] - self._min[0][1] <= self.threshold:
+                self._armed = True
+                return None
+            if not self._armed:
+                return None
+
+            # a single opening is reported per crossing of the threshold, at the reading that crossed it
+            event = timestamp
+            self._armed = False
+            self.last_event = event
+            self._pending = event
+
+        for callback in self._callbacks:
+            callback(event)
+
+        return event
+
+    def take_event(self):
+        with self._lock:
+            event, self._pending = self._pending, None
+
+        return event
+
+    def add_callback(self, callback):
+        self._callbacks.append(callback)
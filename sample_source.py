@@ -0,0 +1,269 @@
+""" Sample source
+
+This file contains the sources sensor readings are read from. Serial reading code only uses a small part of the
+pyserial interface (read, in_waiting, reset_input_buffer, close, is_open, port), so besides the real serial port,
+readings can come from a simulated device producing the same bytes the Arduino would send:
+    * 'serial' - the Arduino on SERIAL_PORT, read through pyserial
+    * 'synthetic' - generated readings, at a configurable rate per sensor stream (up to kHz), with noise or
+      step profiles; useful for load testing the whole pipeline without a device
+    * 'replay' - readings recorded in sensor CSV files in REPLAY_FOLDER, replayed at REPLAY_SPEED times real speed
+
+The source in use is set by SAMPLE_SOURCE. Simulated sources encode readings in SERIAL_PROTOCOL.
+
+It can also be imported as a module and contains the following
+classes and methods:
+    * SimulatedSource - base of simulated sources, serial-like reading of generated bytes
+    * SyntheticSource - generates readings with noise/step profiles at configurable rates
+    * ReplaySource - replays readings recorded in sensor CSV files
+    * is_present - checks whether a source's device is present, without opening it
+    * open_source - opens a source of the given kind
+"""
+import os
+import random
+import threading
+import time
+
+import serial
+import serial.tools.list_ports
+
+import constants
+import serial_protocol as sp
+import snapshot_cache as sc
+
+
+class SimulatedSource:
+    """
+        A base class of simulated devices, read like a pyserial port.
+        Subclasses implement _due(self, now), returning readings due until monotonic time now, in time order.
+
+        Attributes
+        ----------
+        port : str
+            Name of the port the source pretends to be connected to.
+
+        timeout : float
+            Number of seconds read waits for data, like the timeout of a pyserial port.
+
+        protocol : str
+            'ascii' or 'binary', as set by SERIAL_PROTOCOL.
+
+        is_open : bool
+            False after close.
+
+        sent : int
+            Number of readings produced so far.
+
+        Methods
+        -------
+        read(self, size=1)
+            Return up to size bytes, waiting up to timeout seconds for the first one.
+
+        in_waiting
+            Number of bytes that can be read without waiting.
+
+        reset_input_buffer(self)
+            Drop bytes produced but not yet read.
+
+        close(self)
+            Close the source.
+    """
+
+    poll_secs = 0.001  # how often read checks for due readings while waiting
+
+    def __init__(self, port, timeout=1, protocol=None):
+        self.port = port
+        self.timeout = timeout
+        self.protocol = protocol if protocol is not None else constants.SERIAL_PROTOCOL
+        self.is_open = True
+        self.sent = 0
+
+        self._start = time.monotonic()
+        self._pending = bytearray()
+        self._lock = threading.Lock()
+
+    @property
+    def in_waiting(self):
+        with self._lock:
+            self._produce()
+            return len(self._pending)
+
+    def read(self, size=1):
+        if not self.is_open:
+            raise serial.PortNotOpenError()
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._lock:
+                self._produce()
+                if self._pending or time.monotonic() >= deadline:
+                    data = bytes(self._pending[:size])
+                    del self._pending[:size]
+                    return data
+            time.sleep(self.poll_secs)
+
+    def reset_input_buffer(self):
+        with self._lock:
+            self._produce()
+            self._pending.clear()
+
+    def close(self):
+        self.is_open = False
+
+    def _produce(self):
+        for reading in self._due(time.monotonic()):
+            self._pending += sp.encode_reading(reading, self.protocol)
+            self.sent += 1
+
+    def _due(self, now):
+        raise NotImplementedError
+
+    def _millis(self, at):
+        return int((at - self._start) * 1000)
+
+
+class SyntheticSource(SimulatedSource):
+    """
+        A class used to simulate the Arduino with generated readings.
+        Each stream produces readings at its own rate, with gaussian noise around a base value. With the 'step'
+        profile, the base value also jumps by the stream's step every SYNTHETIC_STEP_SECS seconds and back,
+        e.g. to trigger door/window opening detection.
+
+        Attributes
+        ----------
+        rates : dict
+            (sensor, quantity) : readings per second. Default SYNTHETIC_RATES_HZ.
+
+        profile : str
+            'noise' or 'step'. Default SYNTHETIC_PROFILE.
+    """
+
+    def __init__(self, port='synthetic', rates=None, profile=None, timeout=1, protocol=None):
+        super().__init__(port, timeout, protocol)
+        self.rates = rates if rates is not None else constants.SYNTHETIC_RATES_HZ
+        self.profile = profile if profile is not None else constants.SYNTHETIC_PROFILE
+
+        self._counts = {stream: 0 for stream in self.rates}
+
+    def value(self, stream, at):
+        """ Return generated value of stream at seconds since the source was opened. """
+
+        base, noise, step = constants.SYNTHETIC_VALUES[stream]
+        if self.profile == 'step' and int(at // constants.SYNTHETIC_STEP_SECS) % 2:
+            base += step
+
+        return random.gauss(base, noise)
+
+    def _due(self, now):
+        readings = []
+        for stream, rate in self.rates.items():
+            due = int((now - self._start) * rate)
+            for i in range(self._counts[stream], due):
+                at = i / rate
+                readings.append((at, sp.Reading(*stream, self.value(stream, at), self._millis(self._start + at))))
+            self._counts[stream] = max(due, self._counts[stream])
+
+        readings.sort(key=lambda reading: reading[0])
+        return [reading for _, reading in readings]
+
+
+class ReplaySource(SimulatedSource):
+    """
+        A class used to simulate the Arduino by replaying readings recorded in sensor CSV files.
+        Readings of all files are merged in time order and sent with their recorded spacing, divided by speed.
+
+        Attributes
+        ----------
+        filepaths : list
+            Recorded sensor CSV files. Default files named like those in config.ini, in REPLAY_FOLDER.
+
+        speed : float
+            Replay speed, 1 for real time. Default REPLAY_SPEED.
+
+        loop : bool
+            Start over after the last reading. Default REPLAY_LOOP.
+    """
+
+    def __init__(self, port='replay', filepaths=None, speed=None, loop=None, timeout=1, protocol=None):
+        super().__init__(port, timeout, protocol)
+        if filepaths is None:
+            filepaths = [os.path.join(constants.REPLAY_FOLDER, os.path.basename(filepath))
+                         for filepath in constants.streams.values()]
+        self.filepaths = filepaths
+        self.speed = speed if speed is not None else constants.REPLAY_SPEED
+        self.loop = loop if loop is not None else constants.REPLAY_LOOP
+
+        self._readings = self._load()
+        self._next = 0
+        self._offset = 0  # recorded seconds replayed in previous loops
+
+    def _load(self):
+        """ Return list of (recorded seconds since first reading, sensor, quantity, value), in time order. """
+
+        readings = []
+        for filepath in self.filepaths:
+            data = sc.get_snapshot(filepath)
+            if data is None:
+                continue
+            readings.extend(zip(data['Vrijeme'], data['Senzor'].str.strip(), data['Velicina'].str.strip(),
+                                data['Vrijednost']))
+
+        readings.sort(key=lambda reading: reading[0])
+        if readings:
+            first = readings[0][0]
+            readings = [(timestamp - first, sensor, quantity, float(value))
+                        for timestamp, sensor, quantity, value in readings]
+
+        return readings
+
+    def _due(self, now):
+        replayed = (now - self._start) * self.speed
+        readings = []
+        while self._readings:
+            if self._next == len(self._readings):
+                if not self.loop:
+                    break
+                # leave a second between the last reading and the first one of the next loop
+                self._offset += self._readings[-1][0] + 1
+                self._next = 0
+
+            at, sensor, quantity, value = self._readings[self._next]
+            if self._offset + at > replayed:
+                break
+
+            readings.append(sp.Reading(sensor, quantity, value,
+                                       self._millis(self._start + (self._offset + at) / self.speed)))
+            self._next += 1
+
+        return readings
+
+
+def is_present(port, kind=None):
+    """ Return True if the device of a source is present. Simulated devices always are.
+
+        Arguments:
+            port - name of the serial port
+            kind - 'serial', 'synthetic' or 'replay'; default SAMPLE_SOURCE
+    """
+
+    if (kind if kind is not None else constants.SAMPLE_SOURCE) != 'serial':
+        return True
+
+    ports = [tuple(p)[0] for p in serial.tools.list_ports.comports()]
+    return any(port in p for p in ports)
+
+
+def open_source(port, kind=None):
+    """ Return an open source of readings. Raises serial.SerialException if the serial port can't be opened.
+
+        Arguments:
+            port - name of the serial port
+            kind - 'serial', 'synthetic' or 'replay'; default SAMPLE_SOURCE
+    """
+
+    kind = kind if kind is not None else constants.SAMPLE_SOURCE
+    if kind == 'synthetic':
+        return SyntheticSource(port)
+    if kind == 'replay':
+        return ReplaySource(port)
+
+    return serial.Serial(port, constants.BAUD_RATE, timeout=1)
@@ -0,0 +1,276 @@
+""" Sensor buffer
+
+This file contains in-memory buffers holding each sensor's readings throughout the last BUFFER_MINUTES minutes.
+Buffers are filled by the serial thread as readings arrive and read by plots, averages and current values,
+so CSV files only need to be appended to at runtime.
+
+It can also be imported as a module and contains the following
+classes and methods:
+    * RunningStats - statistics of a window of readings, updated in O(1) per added/removed reading
+    * SensorBuffer - time-indexed ring buffer of (epoch, value) readings for a single sensor stream
+    * latest_time - returns time of the newest reading in buffers of given files
+    * shown - returns file of the selected device's stream, matching a file of the default device's stream
+    * shown_buffer - returns buffer of the selected device's stream, matching a file of the default device's stream
+    * get_buffer - returns the buffer matching a sensor's CSV file
+"""
+import threading
+from collections import deque
+
+import constants
+
+
+class RunningStats:
+    """
+        A class used to keep statistics of a window of readings up to date in O(1) per reading.
+        Mean and variance are updated using Welford's algorithm, and reversed when readings leave the window.
+        Extremes are kept in monotonic deques, so the window's minimum and maximum are always at their fronts.
+        Readings in them are numbered in order of adding, so readings removed are told apart even if they share
+        a timestamp.
+
+        Attributes
+        ----------
+        count : int
+            Number of readings in the window.
+
+        total : float
+            Sum of readings in the window.
+
+        Methods
+        -------
+        add(self, value)
+            Add a reading to the window.
+
+        remove(self, value)
+            Remove the oldest reading from the window.
+
+        clear(self)
+            Remove all readings from the window.
+
+        mean(self), variance(self), minimum(self), maximum(self)
+            Return statistics of the window. Raise IndexError if the window is empty.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.count = 0
+        self.total = 0.0
+
+        self._mean = 0.0
+        self._m2 = 0.0  # sum of squared differences from the mean
+        self._added = 0  # number of the next reading added
+        self._max = deque()  # (number, value) readings with decreasing values
+        self._min = deque()  # (number, value) readings with increasing values
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._max.append((self._added, value))
+        self._min.append((self._added, value))
+        self._added += 1
+
+    def remove(self, value):
+        self.count -= 1
+        if self.count == 0:
+            self.clear()
+            return
+
+        self.total -= value
+
+        delta = value - self._mean
+        self._mean -= delta / self.count
+        self._m2 = max(self._m2 - delta * (value - self._mean), 0.0)
+
+        # extremes numbered before the oldest reading left in the window were removed
+        oldest = self._added - self.count
+        while self._max[0][0] < oldest:
+            self._max.popleft()
+        while self._min[0][0] < oldest:
+            self._min.popleft()
+
+    def mean(self):
+        self._check_empty()
+        return self._mean
+
+    def variance(self):
+        self._check_empty()
+        return self._m2 / self.count
+
+    def minimum(self):
+        self._check_empty()
+        return self._min[0][1]
+
+    def maximum(self):
+        self._check_empty()
+        return self._max[0][1]
+
+    def _check_empty(self):
+        if self.count == 0:
+            raise IndexError('statistics of empty window')
+
+
+class SensorBuffer:
+    """
+        A class used to store one sensor stream's readings from the last BUFFER_MINUTES minutes.
+        Readings older than that (compared to the newest reading) are dropped on every append,
+        so when no new readings arrive, the old ones are kept and shown.
+
+        Attributes
+        ----------
+        sensor : str
+            Name of the sensor as sent over serial (e.g. 'TMP116'), used in graph legends.
+
+        minutes : int
+            Length of the buffer in minutes.
+
+        ready : threading.Event
+            Set when the first reading arrives to the buffer.
+
+        stats : RunningStats
+            Statistics of readings in the buffer, updated on every append and drop.
+
+        version : int
+            Incremented whenever readings in the buffer change.
+
+        Methods
+        -------
+        append(self, timestamp, value)
+            Add a reading to the buffer and drop readings older than buffer length.
+
+        snapshot(self)
+            Return lists of timestamps and values currently in the buffer.
+
+        latest(self)
+            Return the newest value in the buffer. Raises IndexError if the buffer is empty.
+
+        first_time(self), last_time(self)
+            Return timestamps of the oldest/newest reading. Raise IndexError if the buffer is empty.
+
+        mean(self), minimum(self), maximum(self)
+            Return the average/minimum/maximum value in the buffer. Raise IndexError if the buffer is empty.
+    """
+
+    def __init__(self, sensor='', minutes=None):
+        self.sensor = sensor
+        self.minutes = minutes if minutes is not None else constants.BUFFER_MINUTES
+
+        self.ready = threading.Event()
+        self.stats = RunningStats()
+        self.version = 0
+
+        self._readings = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._readings)
+
+    def append(self, timestamp, value):
+        with self._lock:
+            self._readings.append((timestamp, value))
+            self.stats.add(value)
+            self.version += 1
+
+            # drop readings older than buffer length
+            limit = timestamp - self.minutes * 60
+            while self._readings[0][0] <= limit:
+                self.stats.remove(self._readings.popleft()[1])
+
+        self.ready.set()
+
+    def clear(self):
+        with self._lock:
+            self._readings.clear()
+            self.stats.clear()
+            self.version += 1
+
+    def snapshot(self):
+        with self._lock:
+            readings = list(self._readings)
+
+        return [reading[0] for reading in readings], [reading[1] for reading in readings]
+
+    def latest(self):
+        return self._readings[-1][1]
+
+    def first_time(self):
+        return self._readings[0][0]
+
+    def last_time(self):
+        return self._readings[-1][0]
+
+    def mean(self):
+        with self._lock:
+            return self.stats.mean()
+
+    def minimum(self):
+        with self._lock:
+            return self.stats.minimum()
+
+    def maximum(self):
+        with self._lock:
+            return self.stats.maximum()
+
+
+# one buffer per sensor stream, matched to the stream's CSV file
+buffers = {filepath: SensorBuffer(sensor)
+           for device in constants.devices.values() for (sensor, _), filepath in device['streams'].items()}
+selected = constants.DEFAULT_DEVICE  # device whose readings pages show
+
+
+def latest_time(filepaths):
+    """ Return epoch time of the newest reading in buffers of filepaths, None if they are all empty.
+
+        Arguments:
+            filepaths - locations of files whose buffers are checked
+    """
+
+    times = []
+    for filepath in filepaths:
+        try:
+            times.append(get_buffer(filepath).last_time())
+        except IndexError:
+            continue
+
+    return max(times, default=None)
+
+
+def shown(filepath):
+    """ Return file of the selected device's stream matching a file of the default device's stream.
+        Pages refer to streams by files of the default device, and show those of the selected device.
+
+        Arguments:
+            filepath - location of the default device's sensor CSV file
+    """
+
+    if selected == constants.DEFAULT_DEVICE:
+        return filepath
+
+    device = constants.devices[selected]
+    stream = next(stream for stream, path in constants.streams.items() if path == filepath)
+    return device['streams'][stream]
+
+
+def shown_buffer(filepath):
+    """ Return buffer of the selected device's stream matching a file of the default device's stream. """
+
+    return buffers[shown(filepath)]
+
+
+def get_buffer(filepath):
+    """ Return buffer storing readings that are persisted to filepath.
+
+        Arguments:
+            filepath - location of the sensor's CSV file
+    """
+
+    return buffers[filepath]
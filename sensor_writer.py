@@ -0,0 +1,92 @@
+""" Sensor writer
+
+This file contains the writer used to persist incoming sensor readings to their CSV files.
+A file handle per sensor stream is kept open for as long as the writer is running,
+and written lines are flushed in batches, when FLUSH_MAX_LINES lines are pending
+or FLUSH_INTERVAL_SECS seconds have passed since the last flush.
+
+It can also be imported as a module and contains the following
+classes:
+    * SensorWriter - long-lived batched writer holding one handle per sensor CSV file
+"""
+import threading
+import time
+
+import constants
+
+
+class SensorWriter:
+    """
+        A class used to append lines to sensor CSV files through long-lived file handles.
+
+        Attributes
+        ----------
+        max_lines : int
+            Number of pending lines that triggers a flush.
+
+        interval : float
+            Maximum number of seconds written lines can stay pending.
+
+        Methods
+        -------
+        write(self, filepath, line)
+            Append line to filepath's handle and flush if flush policy says so.
+
+        flush_if_due(self)
+            Flush if lines have been pending for longer than interval.
+            Should be called periodically by the writing thread, so lines don't stay pending when no new ones arrive.
+
+        flush(self)
+            Flush all pending lines to their files.
+
+        close(self)
+            Flush all pending lines and close all handles. Writes after closing are ignored.
+    """
+
+    def __init__(self, filepaths, max_lines=None, interval=None):
+        self.max_lines = max_lines if max_lines is not None else constants.FLUSH_MAX_LINES
+        self.interval = interval if interval is not None else constants.FLUSH_INTERVAL_SECS
+
+        self._files = {filepath: open(filepath, 'a', newline='') for filepath in filepaths}
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def write(self, filepath, line):
+        with self._lock:
+            if self._closed:
+                return
+
+            self._files[filepath].write(line)
+            self._pending += 1
+
+            if self._pending >= self.max_lines or time.monotonic() - self._last_flush >= self.interval:
+                self._flush()
+
+    def flush_if_due(self):
+        with self._lock:
+            if self._pending and not self._closed and time.monotonic() - self._last_flush >= self.interval:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._closed:
+                self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+
+            self._flush()
+            for file in self._files.values():
+                file.close()
+            self._closed = True
+
+    def _flush(self):
+        for file in self._files.values():
+            file.flush()
+
+        self._pending = 0
+        self._last_flush = time.monotonic()
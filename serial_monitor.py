@@ -0,0 +1,160 @@
+""" Serial monitor
+
+This file contains the monitor keeping track of whether the Arduino device is connected to SERIAL_PORT.
+Enumerating serial ports is expensive, so it is done on a background thread every PORT_POLL_SECS seconds
+and its result is cached. When the device is plugged in, the port is (re)opened, retrying with
+exponential backoff between RECONNECT_MIN_SECS and RECONNECT_MAX_SECS if opening fails.
+With a simulated SAMPLE_SOURCE, the device is always present and opening it opens the simulated source.
+
+It can also be imported as a module and contains the following
+classes:
+    * PortMonitor - background serial port presence monitor with cached connection state
+"""
+import threading
+
+import serial
+
+import constants
+import sample_source as ss
+
+
+class PortMonitor:
+    """
+        A class used to monitor serial port presence and keep the port open while the device is connected.
+
+        Attributes
+        ----------
+        port : str
+            Name of the monitored serial port (e.g. COM4).
+
+        poll_interval : float
+            Number of seconds between two port enumerations.
+
+        serial : serial.Serial
+            The open port (or simulated source), read by serial reading code. None before it is first opened.
+
+        Methods
+        -------
+        start(self)
+            Check port presence once and start monitoring it on a background thread.
+
+        stop(self)
+            Stop monitoring and close the port.
+
+        is_connected(self)
+            Return cached connection state. Cheap enough to call before every serial read.
+
+        wait_connected(self, timeout)
+            Block until the device is connected or timeout seconds pass. Returns connection state.
+
+        add_callback(self, callback)
+            Register callback(connected) to be called on the monitor thread whenever connection state changes.
+
+        set_port(self, port)
+            Start monitoring another port, closing the current one.
+
+        report_failure(self)
+            Mark the device as disconnected after a failed read, so the port is reopened.
+    """
+
+    def __init__(self, port, poll_interval=None, serial=None):
+        self.port = port
+        self.poll_interval = poll_interval if poll_interval is not None else constants.PORT_POLL_SECS
+        self.serial = serial
+
+        self._connected = threading.Event()
+        self._stopped = threading.Event()
+        self._callbacks = []
+        self._lock = threading.RLock()
+        self._thread = None
+        self._backoff = constants.RECONNECT_MIN_SECS
+        self._retry_in = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self._check()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        with self._lock:
+            self._set_connected(False)
+
+    def is_connected(self):
+        return self._connected.is_set()
+
+    def wait_connected(self, timeout):
+        return self._connected.wait(timeout)
+
+    def add_callback(self, callback):
+        self._callbacks.append(callback)
+
+    def set_port(self, port):
+        with self._lock:
+            self._set_connected(False)
+            self.port = port
+            self._backoff = constants.RECONNECT_MIN_SECS
+            self._retry_in = 0
+        self._check()
+
+    def report_failure(self):
+        with self._lock:
+            self._set_connected(False)
+
+    def _run(self):
+        while not self._stopped.wait(self.poll_interval):
+            self._check()
+
+    def _check(self):
+        """ Enumerate ports and update connection state, opening the port if the device was plugged in. """
+
+        present = ss.is_present(self.port)
+
+        with self._lock:
+            if not present:
+                self._set_connected(False)
+                self._backoff = constants.RECONNECT_MIN_SECS
+                self._retry_in = 0
+            elif not self.is_connected():
+                # wait for backoff to expire before trying to open port again
+                self._retry_in -= self.poll_interval
+                if self._retry_in > 0:
+                    return
+
+                if self._open():
+                    self._backoff = constants.RECONNECT_MIN_SECS
+                    self._set_connected(True)
+                else:
+                    self._retry_in = self._backoff
+                    self._backoff = min(self._backoff * 2, constants.RECONNECT_MAX_SECS)
+
+    def _open(self):
+        """ Open monitored port as self.serial, reusing it if it's already open. Returns True on success. """
+
+        current = self.serial
+        if getattr(current, 'is_open', False) and current.port == self.port:
+            return True
+
+        try:
+            self.serial = ss.open_source(self.port)
+            self.serial.reset_input_buffer()  # clear input serial buffer
+            return True
+        except serial.SerialException:
+            return False
+
+    def _set_connected(self, connected):
+        if connected == self.is_connected():
+            return
+
+        if connected:
+            self._connected.set()
+        else:
+            self._connected.clear()
+            if getattr(self.serial, 'is_open', False):
+                self.serial.close()
+
+        for callback in self._callbacks:
+            callback(connected)
@@ -0,0 +1,194 @@
+""" Serial protocol
+
+This file contains the decoder of sensor readings sent by the Arduino over serial.
+The Arduino sends readings either as ASCII lines ("DPS310, pressure, 101325.00\r\n"), or, if compiled with
+BINARY_FRAMES, as COBS-encoded frames delimited by a zero byte. A frame carries a sensor ID, a channel ID,
+a float32 value, device millis (uint32) and a CRC-16/CCITT-FALSE of the preceding fields, all little-endian.
+Binary frames are 12 bytes (14 on the wire) instead of ~30 for an ASCII line, so many more readings per second
+fit through the serial port, and they are decoded without string splitting and float parsing.
+
+The protocol in use is set by SERIAL_PROTOCOL ('ascii' or 'binary').
+Whole chunks of received bytes are decoded at once; incomplete lines/frames are kept for the next chunk.
+
+It can also be imported as a module and contains the following
+classes and methods:
+    * Reading - a decoded sensor reading (sensor, quantity, value, device millis)
+    * FrameDecoder - decodes chunks of received bytes into readings
+    * crc16 - CRC-16/CCITT-FALSE checksum used in binary frames
+    * cobs_decode - decodes a single COBS-encoded frame (without its zero delimiter)
+    * cobs_encode - COBS-encodes a single frame (without its zero delimiter)
+    * encode_reading - encodes a reading the way the Arduino sends it, used by simulated sources
+"""
+import struct
+from collections import namedtuple
+
+Reading = namedtuple('Reading', ['sensor', 'quantity', 'value', 'millis'])
+
+# IDs used in binary frames, matching those in arduino/projekt/projekt.ino
+SENSOR_IDS = {1: 'TMP116', 2: 'HDC2010', 3: 'OPT3001', 4: 'DPS310'}
+CHANNEL_IDS = {1: 'temperature', 2: 'humidity', 3: 'light', 4: 'pressure'}
+
+FRAME = struct.Struct('<BBfI')  # sensor ID, channel ID, value, device millis; followed by uint16 CRC
+FRAME_SIZE = FRAME.size + 2
+
+
+def _crc16_table():
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return table
+
+
+CRC16_TABLE = _crc16_table()
+
+
+def crc16(data):
+    """ Return CRC-16/CCITT-FALSE (polynomial 0x1021, initial value 0xFFFF) of data. """
+
+    crc = 0xFFFF
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ CRC16_TABLE[(crc >> 8) ^ byte]
+    return crc
+
+
+def cobs_decode(data):
+    """ Return decoded COBS frame, None if the frame is malformed.
+
+        Arguments:
+            data - bytes of an encoded frame, without its zero delimiter
+    """
+
+    decoded = bytearray()
+    i = 0
+    while i < len(data):
+        code = data[i]
+        if code == 0 or i + code > len(data):
+            return None
+
+        decoded += data[i + 1:i + code]
+        i += code
+        if code < 0xFF and i < len(data):
+            decoded.append(0)
+
+    return bytes(decoded)
+
+
+def cobs_encode(data):
+    """ Return COBS-encoded data, without the zero delimiter.
+
+        Arguments:
+            data - bytes of a frame
+    """
+
+    encoded = bytearray()
+    for block in data.split(b'\x00'):
+        # blocks longer than 254 bytes are split into 254 byte blocks not followed by a zero
+        while len(block) >= 0xFE:
+            encoded.append(0xFF)
+            encoded += block[:0xFE]
+            block = block[0xFE:]
+        encoded.append(len(block) + 1)
+        encoded += block
+
+    return bytes(encoded)
+
+
+def encode_reading(reading, protocol='ascii'):
+    """ Return reading encoded as the Arduino sends it - an ASCII line, or a delimited binary frame.
+
+        Arguments:
+            reading - Reading to encode; millis is only used by binary frames
+            protocol - 'ascii' or 'binary'
+    """
+
+    if protocol != 'binary':
+        return f'{reading.sensor}, {reading.quantity}, {reading.value:.2f}\r\n'.encode()
+
+    sensor_id = next(key for key, name in SENSOR_IDS.items() if name == reading.sensor)
+    channel_id = next(key for key, name in CHANNEL_IDS.items() if name == reading.quantity)
+    frame = FRAME.pack(sensor_id, channel_id, reading.value, reading.millis % 2 ** 32)
+    frame += crc16(frame).to_bytes(2, 'little')
+
+    return cobs_encode(frame) + b'\x00'
+
+
+class FrameDecoder:
+    """
+        A class used to decode chunks of bytes received over serial into sensor readings.
+
+        Attributes
+        ----------
+        protocol : str
+            'ascii' or 'binary'.
+
+        errors : int
+            Number of frames/lines that couldn't be decoded (corrupted, failed CRC, unknown IDs, ...).
+
+        Methods
+        -------
+        feed(self, chunk)
+            Decode all complete frames/lines in chunk (and the incomplete rest of previous chunks).
+            Returns list of Readings, in the order they were received.
+
+        reset(self)
+            Drop the incomplete rest of previous chunks, e.g. after reconnecting.
+    """
+
+    def __init__(self, protocol='ascii'):
+        self.protocol = protocol
+        self.errors = 0
+
+        self._rest = b''
+
+    def feed(self, chunk):
+        delimiter = b'\x00' if self.protocol == 'binary' else b'\n'
+        decode = self._decode_frame if self.protocol == 'binary' else self._decode_line
+
+        parts = (self._rest + chunk).split(delimiter)
+        self._rest = parts.pop()
+
+        readings = []
+        for part in parts:
+            if not part.strip():
+                continue
+
+            reading = decode(part)
+            if reading is None:
+                self.errors += 1
+            else:
+                readings.append(reading)
+
+        return readings
+
+    def reset(self):
+        self._rest = b''
+
+    @staticmethod
+    def _decode_frame(data):
+        frame = cobs_decode(data)
+        if frame is None or len(frame) != FRAME_SIZE:
+            return None
+
+        if crc16(frame[:-2]) != int.from_bytes(frame[-2:], 'little'):
+            return None
+
+        sensor_id, channel_id, value, millis = FRAME.unpack_from(frame)
+        if sensor_id not in SENSOR_IDS or channel_id not in CHANNEL_IDS:
+            return None
+
+        # float32 has ~7 significant digits, round to the 2 decimals ASCII lines have
+        return Reading(SENSOR_IDS[sensor_id], CHANNEL_IDS[channel_id], round(value, 2), millis)
+
+    @staticmethod
+    def _decode_line(data):
+        fields = data.decode(errors='replace').strip().split(', ')
+        if len(fields) != 3:
+            return None
+
+        try:
+            return Reading(fields[0], fields[1], float(fields[2]), None)
+        except ValueError:
+            return None
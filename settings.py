@@ -0,0 +1,125 @@
+""" Settings
+
+This file contains the app's live settings - values in the [updatable] section of config.ini, which can be changed
+from the update page while the app runs. They are loaded once, into typed fields of a single Settings object.
+Changes are written back to config.ini atomically (to a temporary file which then replaces it), and passed to
+subscribers, so e.g. new thresholds are used by labels and the door/window opening detector right away, and serial
+ports are only reconnected if they changed. No module is reloaded.
+
+It can also be imported as a module and contains the following
+classes and objects:
+    * Settings - typed settings loaded from a config file, with atomic persistence and change callbacks
+    * current - settings of this app instance, loaded from CONFIG_FILE
+"""
+import configparser
+import os
+import tempfile
+import threading
+
+import constants
+
+SECTION = 'updatable'
+
+# setting : (type, default if missing from the config file; None if it is required)
+FIELDS = {'serial_port': (str, None),
+          'icon_path': (str, None),
+          'temp_min': (float, None),
+          'temp_max': (float, None),
+          'hum_min': (float, None),
+          'hum_max': (float, None),
+          'lux_min': (float, None),
+          'lux_max': (float, None),
+          'pres_min': (float, None),
+          'pres_max': (float, None),
+          'pressure_diff_pa': (float, constants.PRESSURE_DIFF_PA)}
+
+
+class Settings:
+    """
+        A class used to keep settings loaded from a config file. Settings are read as attributes,
+        e.g. settings.temp_min, and changed through update.
+
+        Attributes
+        ----------
+        path : str
+            Location of the config file.
+
+        serial_port, icon_path : str
+        temp_min, temp_max, hum_min, hum_max, lux_min, lux_max, pres_min, pres_max, pressure_diff_pa : float
+            Settings, as listed in FIELDS.
+
+        Methods
+        -------
+        update(self, values)
+            Set settings to values ({setting : value}, values converted to the settings' types), write them to
+            the config file, and call subscribers with those that changed. Raises ValueError (nothing is changed)
+            if a setting is unknown or a value can't be converted, and OSError (nothing is changed) if the config
+            file can't be written.
+
+        subscribe(self, callback)
+            Register callback(changed) to be called after settings change, with {setting : new value} of those
+            that changed. Called on the thread calling update.
+
+        as_dict(self)
+            Return {setting : value} of all settings.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+        parser = configparser.ConfigParser()
+        parser.read(path)
+        section = parser[SECTION]
+        for name, (kind, default) in FIELDS.items():
+            setattr(self, name, kind(section[name]) if default is None else kind(section.get(name, default)))
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in FIELDS}
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
+
+    def update(self, values):
+        converted = {}
+        for name, value in values.items():
+            if name not in FIELDS:
+                raise ValueError(f'Unknown setting {name}')
+            converted[name] = FIELDS[name][0](value)
+
+        with self._lock:
+            changed = {name: value for name, value in converted.items() if getattr(self, name) != value}
+            if not changed:
+                return
+
+            # settings are only changed once they are written, so a failed write leaves them as they were
+            self._write({**self.as_dict(), **changed})
+            for name, value in changed.items():
+                setattr(self, name, value)
+
+        for callback in self._callbacks:
+            callback(changed)
+
+    def _write(self, values):
+        """ Write settings values ({setting : value}) to the config file, leaving its other sections as they are. """
+
+        parser = configparser.ConfigParser()
+        parser.read(self.path)
+        for name, value in values.items():
+            parser.set(SECTION, name, str(value))
+
+        # write a temporary file next to the config file and replace it, so it's never left half-written
+        folder = os.path.dirname(os.path.abspath(self.path))
+        descriptor, temporary = tempfile.mkstemp(dir=folder, prefix='.config-', suffix='.ini')
+        try:
+            with os.fdopen(descriptor, 'w') as file:
+                parser.write(file)
+            os.replace(temporary, self.path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+
+current = Settings(constants.CONFIG_FILE)
@@ -0,0 +1,130 @@
+""" Shared ring
+
+This file contains ring buffers of sensor readings in shared memory, used to pass readings from the collector
+(collector.py) to an attached app without writing and parsing CSV text. CSV files are still written by the collector,
+as persistent storage.
+
+Each sensor stream has its own ring of SHARED_RING_RECORDS fixed-size (timestamp, value) float64 records,
+preceded by a generation counter - the number of records written so far. There is a single writer (the collector),
+which writes a record and only then increments the counter. Readers check the counter again after copying records,
+and retry if the writer has lapped the records being copied in the meantime.
+
+Readers get copies of new records, not NumPy views of the ring. The writer overwrites records as it goes round,
+and plots keep references to the arrays they are given, so a view would change under a drawn plot (and shared
+memory can't be closed while views of it exist). Records are copied into sensor buffers once, as they arrive;
+what is saved is writing and parsing CSV text on every refresh.
+
+It can also be imported as a module and contains the following
+classes and methods:
+    * SharedRing - ring buffer of (timestamp, value) records in shared memory, with a generation counter
+    * ring_name - returns name of shared memory of a sensor stream
+"""
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import constants
+
+HEADER = 16  # bytes - generation counter and capacity, both uint64
+
+
+class SharedRing:
+    """
+        A class used to publish (writer) or read (reader) a sensor stream's readings in shared memory.
+
+        Attributes
+        ----------
+        name : str
+            Name of the shared memory.
+
+        capacity : int
+            Number of records in the ring.
+
+        Methods
+        -------
+        append(self, timestamp, value)
+            Write a record. Only called by the single writer.
+
+        generation(self)
+            Return number of records written so far.
+
+        read_since(self, generation)
+            Return (times, values, generation) - copies of records written since generation (those still in the
+            ring), and the generation to read from next time.
+
+        close(self)
+            Detach from shared memory; the writer also frees it.
+    """
+
+    def __init__(self, name, capacity=None, create=False):
+        self.name = name
+        self._create = create
+
+        if create:
+            capacity = capacity if capacity is not None else constants.SHARED_RING_RECORDS
+            size = HEADER + capacity * 16
+            try:
+                self._memory = shared_memory.SharedMemory(name, create=True, size=size)
+            except FileExistsError:
+                # left over by a collector that didn't exit cleanly
+                stale = shared_memory.SharedMemory(name)
+                stale.close()
+                stale.unlink()
+                self._memory = shared_memory.SharedMemory(name, create=True, size=size)
+        else:
+            self._memory = shared_memory.SharedMemory(name)
+            if os.name != 'nt':
+                # readers must not free memory they don't own when they exit
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(self._memory._name, 'shared_memory')
+
+        self._header = np.ndarray((2,), dtype=np.uint64, buffer=self._memory.buf)
+        if create:
+            self._header[:] = (0, capacity)
+        self.capacity = int(self._header[1])
+        self._records = np.ndarray((self.capacity, 2), dtype=np.float64, buffer=self._memory.buf, offset=HEADER)
+
+    def append(self, timestamp, value):
+        written = int(self._header[0])
+        self._records[written % self.capacity] = (timestamp, value)
+        self._header[0] = written + 1  # published only after the record is written
+
+    def generation(self):
+        return int(self._header[0])
+
+    def read_since(self, generation):
+        while True:
+            written = self.generation()
+            # the oldest slot could be being overwritten by the next record, so it's left out
+            start = max(generation, written - self.capacity + 1) if generation <= written else 0
+            records = self._take(start, written)
+
+            # check that the writer hasn't reached records from start on while they were being copied
+            if self.generation() - self.capacity < start:
+                return records[:, 0], records[:, 1], written
+
+    def close(self):
+        del self._header, self._records  # views have to be released before the memory is
+        self._memory.close()
+        if self._create:
+            self._memory.unlink()
+
+    def _take(self, start, end):
+        """ Return copy of records with generations from start to end. """
+
+        first, last = start % self.capacity, end % self.capacity
+        if end == start:
+            return np.empty((0, 2))
+        if first < last or last == 0:
+            return self._records[first:last or self.capacity].copy()
+
+        return np.concatenate([self._records[first:], self._records[:last]])
+
+
+def ring_name(stream, device=None):
+    """ Return name of shared memory of a (sensor, quantity) stream of a device (default the default device). """
+
+    if device is None or device == constants.DEFAULT_DEVICE:
+        return f'{constants.SHARED_RING_PREFIX}_{stream[0]}_{stream[1]}'
+    return f'{constants.SHARED_RING_PREFIX}_{device}_{stream[0]}_{stream[1]}'
@@ -0,0 +1,150 @@
+""" Snapshot cache
+
+This file contains the cache of parsed sensor CSV files.
+Each file is parsed at most once per change - cached snapshots are keyed by file path and validated by
+file modification time and size, so every consumer asking for an unchanged file gets the same parsed data.
+At most SNAPSHOT_CACHE_SIZE snapshots are kept, least recently used ones are dropped first.
+
+It can also be imported as a module and contains the following
+classes and methods:
+    * SnapshotCache - LRU cache of parsed files, keyed by path and (mtime, size), with hit and miss counters
+    * parse_times - parses a column of CSV timestamps (epoch milliseconds or legacy format) to epoch seconds
+    * read_sensor_csv - parses a sensor CSV file into a DataFrame with epoch timestamps
+    * get_snapshot - returns parsed snapshot of a sensor CSV file from the shared cache
+
+pandas is only imported when the first file is parsed, so the app window can be shown before it is loaded.
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import constants
+
+
+class SnapshotCache:
+    """
+        A class used to cache results of parsing files until the files change.
+
+        Attributes
+        ----------
+        loader : callable
+            Called with file path to parse the file on a cache miss.
+
+        size : int
+            Maximum number of cached snapshots.
+
+        hits, misses : int
+            Number of lookups served from cache / that had to parse the file.
+
+        Methods
+        -------
+        get(self, filepath)
+            Return parsed snapshot of filepath, None if the file doesn't exist or is empty.
+
+        clear(self)
+            Drop all cached snapshots.
+    """
+
+    def __init__(self, loader, size=None):
+        self.loader = loader
+        self.size = size if size is not None else constants.SNAPSHOT_CACHE_SIZE
+        self.hits = 0
+        self.misses = 0
+
+        self._snapshots = OrderedDict()  # filepath : ((mtime, size), snapshot)
+        self._lock = threading.Lock()
+
+    def get(self, filepath):
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            return None
+        if stat.st_size == 0:
+            return None
+
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._snapshots.get(filepath)
+            if cached is not None and cached[0] == key:
+                self._snapshots.move_to_end(filepath)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        snapshot = self.loader(filepath)
+
+        with self._lock:
+            self._snapshots[filepath] = (key, snapshot)
+            self._snapshots.move_to_end(filepath)
+            while len(self._snapshots) > self.size:
+                self._snapshots.popitem(last=False)
+
+        return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+
+
+def parse_times(column):
+    """ Return NumPy array of epoch seconds of a column of CSV timestamps.
+        Timestamps are epoch milliseconds; those in LEGACY_TIME_FORMAT, written by older versions, are parsed too.
+
+        Arguments:
+            column - pandas Series of timestamps, as read from a CSV file
+    """
+
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(column):
+        return column.to_numpy(dtype=float) / 1000
+
+    text = column.astype(str).str.strip()
+    millis = pd.to_numeric(text, errors='coerce')
+    times = millis.to_numpy(dtype=float) / 1000
+
+    legacy = millis.isna().to_numpy()
+    if legacy.any():
+        parsed = pd.to_datetime(text[legacy], format=constants.LEGACY_TIME_FORMAT)
+        times[legacy] = [timestamp.to_pydatetime().timestamp() for timestamp in parsed]
+
+    return times
+
+
+def read_sensor_csv(filepath):
+    """ Return readings in sensor CSV file as a DataFrame, with 'Vrijeme' parsed to epoch seconds.
+        An incomplete last line (still being written) is left out. Number of bytes parsed is stored
+        in the DataFrame's attrs['offset'], so the file can be followed from there.
+
+        Arguments:
+            filepath - location of the sensor's CSV file
+    """
+
+    import pandas as pd
+
+    with open(filepath, 'rb') as file:
+        content = file.read()
+    content = content[:content.rfind(b'\n') + 1]
+
+    if content.strip():
+        data = pd.read_csv(io.BytesIO(content), names=constants.headers)
+        data['Vrijeme'] = parse_times(data['Vrijeme'])
+    else:
+        data = pd.DataFrame(columns=constants.headers)
+    data.attrs['offset'] = len(content)
+
+    return data
+
+
+cache = SnapshotCache(read_sensor_csv)  # shared by all consumers of sensor CSV files
+
+
+def get_snapshot(filepath):
+    """ Return parsed readings of sensor CSV file from the shared cache, None if there are none.
+
+        Arguments:
+            filepath - location of the sensor's CSV file
+    """
+
+    return cache.get(filepath)
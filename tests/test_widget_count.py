@@ -0,0 +1,73 @@
+""" Widget count
+
+Checks that pages make their widgets once, so updating them doesn't add widgets. Pages are built on a Tk root, so
+these tests are skipped when no display is available.
+"""
+import os
+import sys
+import tkinter as tk
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+UPDATES = 5
+
+
+def display_available():
+    try:
+        tk.Tk().destroy()
+    except tk.TclError:
+        return False
+    return True
+
+
+@unittest.skipUnless(display_available(), 'no display available')
+class WidgetCountTest(unittest.TestCase):
+
+    def setUp(self):
+        import file_handler as fh
+        import gui
+        import pages as pg
+
+        fh.folder_prep()
+        fh.fill_buffers()
+
+        self.gui, self.pg = gui, pg
+        self.app = gui.SensorCentral()
+        self.app.withdraw()
+
+        # make all pages, as they are made when first shown
+        for page in [*gui.sensor_pages, pg.UpdatePage, pg.DiagnosticsPage, pg.StartPage]:
+            self.app.show_frame(page)
+        pg.StartPage.init_plots(self.app.frames[pg.StartPage])
+        self.app.update_idletasks()
+
+    def tearDown(self):
+        self.app.destroy()
+
+    def test_start_page_updates(self):
+        count = self.app.widget_count()
+        for _ in range(UPDATES):
+            self.app.app_update()
+            self.app.update_idletasks()
+            self.assertEqual(self.app.widget_count(), count)
+
+    def test_sensor_page_updates(self):
+        count = self.app.widget_count()
+        for _ in range(UPDATES):
+            for page in self.gui.sensor_pages:
+                self.app.show_frame(page)
+                self.app.sensor_update()
+                self.app.update_idletasks()
+                self.assertEqual(self.app.widget_count(), count)
+
+    def test_diagnostics_page_updates(self):
+        count = self.app.widget_count()
+        for _ in range(UPDATES):
+            self.pg.DiagnosticsPage.update_data(self.app.frames[self.pg.DiagnosticsPage])
+            self.app.update_idletasks()
+            self.assertEqual(self.app.widget_count(), count)
+
+
+if __name__ == '__main__':
+    unittest.main()
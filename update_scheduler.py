@@ -0,0 +1,101 @@
+""" Update scheduler
+
+This file contains the scheduler used to periodically update app pages without touching Tk from other threads.
+Every interval, page data is prepared (read from buffers, aggregated, formatted) in a thread pool,
+and only the finished results are passed back to the Tk thread, through a queue it polls every UPDATE_POLL_MS.
+If the previous cycle is still running when a new one is due, the new one is skipped (ticks coalesce).
+
+It can also be imported as a module and contains the following
+classes:
+    * UpdateScheduler - periodic worker-pool data preparation with results applied on the Tk thread
+"""
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import constants
+
+executor = ThreadPoolExecutor(max_workers=constants.UPDATE_WORKERS)  # shared by all schedulers
+
+
+class UpdateScheduler:
+    """
+        A class used to repeatedly prepare data on a worker thread and apply it on the Tk thread.
+        All methods should be called from the Tk thread.
+
+        Attributes
+        ----------
+        root : tk.Tk
+            App whose after() is used for scheduling.
+
+        interval : float
+            Number of seconds between two update cycles. The first cycle starts after interval.
+
+        prepare : callable
+            Called without arguments on a worker thread. Must not touch Tk widgets.
+
+        apply : callable
+            Called with result of prepare on the Tk thread.
+
+        coalesced : int
+            Number of cycles skipped because the previous one was still running.
+
+        Methods
+        -------
+        start(self)
+            Start scheduling update cycles.
+
+        stop(self)
+            Stop scheduling update cycles. A cycle already running will not be applied.
+    """
+
+    def __init__(self, root, interval, prepare, apply):
+        self.root = root
+        self.interval = interval
+        self.prepare = prepare
+        self.apply = apply
+        self.coalesced = 0
+
+        self._results = queue.Queue()
+        self._running = False
+        self._stopped = True
+        self._after_ids = []
+
+    def start(self):
+        self._stopped = False
+        self._after_ids = [self.root.after(int(self.interval * 1000), self._tick),
+                           self.root.after(constants.UPDATE_POLL_MS, self._poll)]
+
+    def stop(self):
+        self._stopped = True
+        for after_id in self._after_ids:
+            self.root.after_cancel(after_id)
+
+    def _tick(self):
+        if self._stopped:
+            return
+
+        if self._running:
+            self.coalesced += 1
+        else:
+            self._running = True
+            future = executor.submit(self.prepare)
+            future.add_done_callback(self._results.put)  # runs on the worker thread, so only enqueue
+
+        self._after_ids[0] = self.root.after(int(self.interval * 1000), self._tick)
+
+    def _poll(self):
+        if self._stopped:
+            return
+
+        try:
+            future = self._results.get_nowait()
+        except queue.Empty:
+            pass
+        else:
+            self._running = False
+            try:
+                self.apply(future.result())
+            except Exception as exception:
+                print(f'Update failed: {exception!r}')
+
+        self._after_ids[1] = self.root.after(constants.UPDATE_POLL_MS, self._poll)